@@ -45,6 +45,14 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = Base.metadata
 
+
+def include_name(name, type_, parent_names) -> bool:
+    # the FTS5 index and its shadow tables are created by hand in the migrations
+    if type_ == "table" and name and name.startswith("lexemes_fts"):
+        return False
+
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -69,7 +77,8 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
-        render_as_batch=True
+        render_as_batch=True,
+        include_name=include_name
     )
 
     with context.begin_transaction():
@@ -83,7 +92,8 @@ def do_run_migrations(connection: Connection) -> None:
                       target_metadata=target_metadata,
                       render_as_batch=is_sqlite,
                       compare_type=True,
-                      compare_server_default=True
+                      compare_server_default=True,
+                      include_name=include_name
                       )
 
     with context.begin_transaction():
@@ -0,0 +1,57 @@
+"""Added lexemes full-text index
+
+Revision ID: c4a7d2e9f016
+Revises: b8e3f5a1c7d4
+Create Date: 2026-10-19 15:17:45.206391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a7d2e9f016'
+down_revision: Union[str, None] = 'b8e3f5a1c7d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS lexemes_fts USING fts5("
+        "text, content='lexemes', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+        ")"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS lexemes_fts_after_insert AFTER INSERT ON lexemes "
+        "BEGIN "
+        "INSERT INTO lexemes_fts (rowid, text) VALUES (NEW.id, NEW.text); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS lexemes_fts_after_delete AFTER DELETE ON lexemes "
+        "BEGIN "
+        "INSERT INTO lexemes_fts (lexemes_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text); "
+        "END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS lexemes_fts_after_update AFTER UPDATE OF text ON lexemes "
+        "BEGIN "
+        "INSERT INTO lexemes_fts (lexemes_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text); "
+        "INSERT INTO lexemes_fts (rowid, text) VALUES (NEW.id, NEW.text); "
+        "END"
+    )
+
+    # indexing the existing lexemes
+    op.execute("INSERT INTO lexemes_fts (lexemes_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS lexemes_fts_after_update")
+    op.execute("DROP TRIGGER IF EXISTS lexemes_fts_after_delete")
+    op.execute("DROP TRIGGER IF EXISTS lexemes_fts_after_insert")
+    op.execute("DROP TABLE IF EXISTS lexemes_fts")
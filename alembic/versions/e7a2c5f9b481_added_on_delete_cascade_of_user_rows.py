@@ -0,0 +1,72 @@
+"""Added on delete cascade of user rows
+
+Revision ID: e7a2c5f9b481
+Revises: d1f6b3a8e2c5
+Create Date: 2026-10-19 17:03:51.629184
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a2c5f9b481'
+down_revision: Union[str, None] = 'd1f6b3a8e2c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# the foreign keys are unnamed in sqlite, batch mode finds them by this convention
+naming_convention = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+}
+
+# (table, column, ON DELETE action) of every foreign key to users.id
+USER_FOREIGN_KEYS = (
+    ('tokens', 'user_id', 'CASCADE'),
+    ('token_usage_daily', 'user_id', 'CASCADE'),
+    ('payments', 'user_id', 'CASCADE'),
+    ('user_words', 'user_id', 'CASCADE'),
+    ('user_learning_languages', 'user_id', 'CASCADE'),
+    ('user_agreements', 'activated_by_id', 'SET NULL'),
+    ('user_agreements', 'deactivated_by_id', 'SET NULL'),
+    ('privacy_policies', 'activated_by_id', 'SET NULL'),
+    ('privacy_policies', 'deactivated_by_id', 'SET NULL'),
+)
+
+# the batch mode recreates the tokens table, its trigger is dropped together with it
+TOKEN_USAGE_DAILY_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS tokens_rollup_after_insert AFTER INSERT ON tokens "
+    "BEGIN "
+    "INSERT INTO token_usage_daily (user_id, day, token_count, cost, calls) "
+    "VALUES (NEW.user_id, date(NEW.created_at), NEW.token_count, NEW.cost, 1) "
+    "ON CONFLICT (user_id, day) DO UPDATE SET "
+    "token_count = token_count + excluded.token_count, cost = cost + excluded.cost, calls = calls + 1; "
+    "END"
+)
+
+
+def replace_user_foreign_keys(cascade: bool) -> None:
+    tables = {}
+    for table_name, column_name, ondelete in USER_FOREIGN_KEYS:
+        tables.setdefault(table_name, []).append((column_name, ondelete if cascade else None))
+
+    for table_name, foreign_keys in tables.items():
+        with op.batch_alter_table(table_name, schema=None, naming_convention=naming_convention) as batch_op:
+            for column_name, ondelete in foreign_keys:
+                name = f'fk_{table_name}_{column_name}_users'
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, 'users', [column_name], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    replace_user_foreign_keys(cascade=True)
+    op.execute(TOKEN_USAGE_DAILY_TRIGGER)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    replace_user_foreign_keys(cascade=False)
+    op.execute(TOKEN_USAGE_DAILY_TRIGGER)
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+# Importing project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy import event, insert, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from config import config
+from developer.database.batching import WriteBatcher
+from developer.database.models import Token
+
+
+def create_engine(database_path: str, pragmas: dict):
+    engine = create_async_engine(f'sqlite+aiosqlite:///{database_path}', pool_size=1, max_overflow=0)
+
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+    event.listen(engine.sync_engine, 'connect', apply_pragmas)
+    return engine
+
+
+async def prepare(engine) -> None:
+    async with engine.begin() as connection:
+        await connection.run_sync(Token.__table__.create)
+
+
+async def run_per_row_commits(engine, writers: int, rows_per_writer: int) -> float:
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    lock = asyncio.Lock()
+
+    async def writer(user_id: int):
+        for _ in range(rows_per_writer):
+            async with lock, session_maker() as session:
+                await session.execute(insert(Token), {'user_id': user_id, 'token_count': 100, 'cost': 0.01})
+                await session.commit()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(user_id) for user_id in range(writers)))
+    return time.perf_counter() - started
+
+
+async def run_group_commits(engine, writers: int, rows_per_writer: int, flush_interval: float,
+                            max_batch_size: int) -> tuple:
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def session_factory():
+        async with lock, session_maker() as session:
+            yield session
+
+    batcher = WriteBatcher(session_factory, flush_interval, max_batch_size)
+    batcher.start()
+
+    async def writer(user_id: int):
+        for _ in range(rows_per_writer):
+            await batcher.insert(Token, user_id=user_id, token_count=100, cost=0.01)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(user_id) for user_id in range(writers)))
+    elapsed = time.perf_counter() - started
+
+    await batcher.stop()
+    return elapsed, batcher.flushed_batches
+
+
+async def main(environment: str, writers: int, rows_per_writer: int):
+    rows = writers * rows_per_writer
+    Config = config[environment]
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(os.path.join(directory, 'per_row.db'), Config.SQLITE_PRAGMAS)
+        await prepare(engine)
+        per_row_elapsed = await run_per_row_commits(engine, writers, rows_per_writer)
+        await engine.dispose()
+
+        engine = create_engine(os.path.join(directory, 'group.db'), Config.SQLITE_PRAGMAS)
+        await prepare(engine)
+        group_elapsed, commits = await run_group_commits(
+            engine, writers, rows_per_writer, Config.WRITE_BATCH_FLUSH_INTERVAL, Config.WRITE_BATCH_MAX_SIZE
+        )
+        async with engine.connect() as connection:
+            stored = (await connection.execute(text("SELECT count(*) FROM tokens"))).scalar()
+        await engine.dispose()
+
+    print(f"{'mode':<12} {'rows/s':>10} {'commits/s':>10} {'commits':>8}")
+    print(f"{'per row':<12} {rows / per_row_elapsed:>10.0f} {rows / per_row_elapsed:>10.0f} {rows:>8}")
+    print(f"{'group':<12} {rows / group_elapsed:>10.0f} {commits / group_elapsed:>10.0f} {commits:>8}")
+    print(f"rows stored with group commit: {stored}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare per-row commits with group commit of batched writes")
+    parser.add_argument("--environment", default="production", help="Config environment to take the settings from")
+    parser.add_argument("--writers", type=int, default=200, help="Number of concurrent writers")
+    parser.add_argument("--rows", type=int, default=50, help="Number of rows inserted by each writer")
+
+    args = parser.parse_args()
+    asyncio.run(main(args.environment, args.writers, args.rows))
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Importing project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from config import config
+
+
+async def run_profile(database_path: str, pragmas: dict, writes: int, reads: int) -> tuple:
+    engine = create_async_engine(f'sqlite+aiosqlite:///{database_path}')
+
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+    event.listen(engine.sync_engine, 'connect', apply_pragmas)
+
+    async with engine.begin() as connection:
+        await connection.execute(text("CREATE TABLE bench (id INTEGER PRIMARY KEY, payload TEXT NOT NULL)"))
+
+    # every write is committed in its own transaction, as the services do
+    started = time.perf_counter()
+    for i in range(writes):
+        async with engine.begin() as connection:
+            await connection.execute(text("INSERT INTO bench (payload) VALUES (:payload)"), {'payload': f'word {i}'})
+    write_rate = writes / (time.perf_counter() - started)
+
+    ids = [random.randint(1, writes) for _ in range(reads)]
+    started = time.perf_counter()
+    async with engine.connect() as connection:
+        for row_id in ids:
+            await connection.execute(text("SELECT payload FROM bench WHERE id = :id"), {'id': row_id})
+    read_rate = reads / (time.perf_counter() - started)
+
+    await engine.dispose()
+    return write_rate, read_rate
+
+
+async def main(environment: str, writes: int, reads: int):
+    profiles = {
+        'default': {},
+        environment: config[environment].SQLITE_PRAGMAS,
+    }
+
+    print(f"{'profile':<12} {'writes/s':>12} {'reads/s':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, pragmas in profiles.items():
+            write_rate, read_rate = await run_profile(os.path.join(directory, f'{name}.db'), pragmas, writes, reads)
+            print(f"{name:<12} {write_rate:>12.0f} {read_rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare SQLite throughput with and without the tuning profile")
+    parser.add_argument("--environment", default="production", help="Config environment to take the profile from")
+    parser.add_argument("--writes", type=int, default=2000, help="Number of single-row write transactions")
+    parser.add_argument("--reads", type=int, default=20000, help="Number of primary key lookups")
+
+    args = parser.parse_args()
+    asyncio.run(main(args.environment, args.writes, args.reads))
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Importing project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy import and_, insert, lambda_stmt, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from developer.database.models import Base, Language, User, UserAgreement
+from developer.database.loader_profiles import AGREEMENT_WITH_LANGUAGE, LANGUAGE_WITH_NAMES
+from developer.database.instrumentation import StatementCacheStats
+from developer.services.user_service import UserService
+from developer.services.user_agreement_service import UserAgreementService
+from developer.services.language_service import LanguageService
+
+
+# the statements as they were built before, on every call
+def plain_user_language(telegram_id: int):
+    return (
+        select(Language.code)
+        .join(User, User.interface_language_id == Language.id)
+        .where(User.telegram_id == telegram_id)
+    )
+
+
+def plain_admin_status(telegram_id: int):
+    return select(User.id, User.is_admin, User.is_confirmed).where(User.telegram_id == telegram_id)
+
+
+def plain_active_agreement(locale_code: str):
+    return (
+        select(UserAgreement)
+        .join(Language, UserAgreement.agreement_language_id == Language.id)
+        .options(*AGREEMENT_WITH_LANGUAGE)
+        .where(and_(Language.code == locale_code, UserAgreement.is_active == True))
+    )
+
+
+def plain_language_by_code(code: str):
+    return select(Language).options(*LANGUAGE_WITH_NAMES).where(Language.code == code)
+
+
+# the same statements as lambda statements, cached by the code location of the lambda
+def lambda_user_language(telegram_id: int):
+    return lambda_stmt(
+        lambda: select(Language.code)
+        .join(User, User.interface_language_id == Language.id)
+        .where(User.telegram_id == telegram_id)
+    )
+
+
+def lambda_admin_status(telegram_id: int):
+    return lambda_stmt(
+        lambda: select(User.id, User.is_admin, User.is_confirmed).where(User.telegram_id == telegram_id)
+    )
+
+
+def lambda_active_agreement(locale_code: str):
+    return lambda_stmt(
+        lambda: select(UserAgreement)
+        .join(Language, UserAgreement.agreement_language_id == Language.id)
+        .options(*AGREEMENT_WITH_LANGUAGE)
+        .where(and_(Language.code == locale_code, UserAgreement.is_active == True))
+    )
+
+
+def lambda_language_by_code(code: str):
+    return lambda_stmt(lambda: select(Language).options(*LANGUAGE_WITH_NAMES).where(Language.code == code))
+
+
+async def prepare(engine, users: int) -> None:
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(insert(Language), [{'id': 1, 'code': 'en'}, {'id': 2, 'code': 'ru'}])
+        await connection.execute(insert(User), [
+            {'id': user_id, 'telegram_id': user_id, 'username': f'user{user_id}', 'interface_language_id': 1}
+            for user_id in range(1, users + 1)
+        ])
+        await connection.execute(insert(UserAgreement).values(
+            version='1.0', agreement_language_id=1, url='https://example.com', is_active=True
+        ))
+
+
+async def measure(session_maker, calls: int, run) -> float:
+    async with session_maker() as session:
+        started = time.perf_counter()
+        for call in range(calls):
+            await run(session, call)
+        elapsed = time.perf_counter() - started
+
+    return elapsed / calls * 1000000
+
+
+async def main(calls: int, users: int):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'cache.db')}")
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        await prepare(engine, users)
+
+        stats = StatementCacheStats()
+        stats.attach(engine)
+
+        # (name, statement built on every call, lambda statement, the prebuilt statement of the service)
+        cases = (
+            ('user language',
+             lambda session, call: session.execute(plain_user_language(call % users + 1)),
+             lambda session, call: session.execute(lambda_user_language(call % users + 1)),
+             lambda session, call: UserService(session).get_user_language(call % users + 1)),
+            ('admin status',
+             lambda session, call: session.execute(plain_admin_status(call % users + 1)),
+             lambda session, call: session.execute(lambda_admin_status(call % users + 1)),
+             lambda session, call: UserService(session).get_user_admin_status(call % users + 1)),
+            ('active agreement',
+             lambda session, call: session.execute(plain_active_agreement('en')),
+             lambda session, call: session.execute(lambda_active_agreement('en')),
+             lambda session, call: UserAgreementService(session)._resolve_active_agreement('en')),
+            ('language by code',
+             lambda session, call: session.execute(plain_language_by_code('ru')),
+             lambda session, call: session.execute(lambda_language_by_code('ru')),
+             lambda session, call: LanguageService(session).get_language_by_code('ru')),
+        )
+
+        print(f"{'query':<20} {'built, us':>10} {'lambda, us':>11} {'prebuilt, us':>13}")
+        for name, *variants in cases:
+            # warming up the compiled cache of every variant
+            for run in variants:
+                await measure(session_maker, 10, run)
+
+            built, lambda_statement, prebuilt = [await measure(session_maker, calls, run) for run in variants]
+            print(f"{name:<20} {built:>10.1f} {lambda_statement:>11.1f} {prebuilt:>13.1f}")
+
+        print(f"Statement cache: {stats.summary()}, "
+              f"{StatementCacheStats.get_cache_size(engine)} compiled statements")
+        for statement, misses in stats.missed_statements.most_common(5):
+            print(f"{misses:>6} misses: {statement[:100]}")
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare rebuilt, lambda and prebuilt statements of the hot queries")
+    parser.add_argument("--calls", type=int, default=5000, help="Number of calls of every query")
+    parser.add_argument("--users", type=int, default=1000, help="Number of users")
+
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.users))
@@ -0,0 +1,171 @@
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Importing project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy import event, func, insert, or_, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from config import config
+from developer.database.models import Base, Language, Lexeme, User, UserWord
+from developer.services.word_service import WordService
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'to', 'vi', 'be', 'do', 'fu', 'ga', 'hi', 'jo', 'pe', 'zu']
+
+CHUNK_SIZE = 50000
+
+
+def create_engine(database_path: str, pragmas: dict):
+    engine = create_async_engine(f'sqlite+aiosqlite:///{database_path}', pool_size=1, max_overflow=0)
+
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+    event.listen(engine.sync_engine, 'connect', apply_pragmas)
+    return engine
+
+
+def make_word(rng: random.Random) -> str:
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5)))
+
+
+async def prepare(engine, rows: int, users: int) -> None:
+    rng = random.Random(42)
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(insert(Language).values(id=1, code='en'))
+        await connection.execute(insert(User), [
+            {'id': user_id, 'telegram_id': user_id, 'username': f'user{user_id}', 'interface_language_id': 1}
+            for user_id in range(1, users + 1)
+        ])
+
+    # every lexeme is unique, the index entries are created by the insert trigger
+    for start in range(1, rows + 1, CHUNK_SIZE):
+        lexeme_ids = range(start, min(start + CHUNK_SIZE, rows + 1))
+        async with engine.begin() as connection:
+            await connection.execute(insert(Lexeme), [
+                {'id': lexeme_id, 'language_id': 1, 'normalized': f'{word}{lexeme_id}', 'text': f'{word}{lexeme_id}'}
+                for lexeme_id, word in ((lexeme_id, make_word(rng)) for lexeme_id in lexeme_ids)
+            ])
+            await connection.execute(insert(UserWord), [
+                {'user_id': lexeme_id % users + 1, 'lexeme_id': lexeme_id} for lexeme_id in lexeme_ids
+            ])
+
+    async with engine.begin() as connection:
+        await connection.execute(text("ANALYZE"))
+
+
+async def measure(engine, queries: list, run) -> tuple:
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    found = 0
+
+    async with session_maker() as session:
+        started = time.perf_counter()
+        for user_id, prefix in queries:
+            found += len(await run(session, user_id, prefix))
+        elapsed = time.perf_counter() - started
+
+    return elapsed / len(queries) * 1000, found / len(queries)
+
+
+async def like_global(session, user_id: int, prefix: str) -> list:
+    # a word of the lexeme starts with the prefix, the same as the FTS5 prefix query
+    result = await session.execute(
+        select(Lexeme.id)
+        .where(or_(Lexeme.text.like(f'{prefix}%'), Lexeme.text.like(f'% {prefix}%')))
+        .limit(50)
+    )
+    return result.all()
+
+
+async def fts_global(session, user_id: int, prefix: str) -> list:
+    result = await session.execute(
+        text("SELECT rowid FROM lexemes_fts WHERE lexemes_fts MATCH :match LIMIT 50"),
+        {'match': f'"{prefix}"*'}
+    )
+    return result.all()
+
+
+async def fts_global_ranked(session, user_id: int, prefix: str) -> list:
+    result = await session.execute(
+        text("SELECT rowid FROM lexemes_fts WHERE lexemes_fts MATCH :match ORDER BY rank LIMIT 50"),
+        {'match': f'"{prefix}"*'}
+    )
+    return result.all()
+
+
+async def like_count(session, user_id: int, prefix: str) -> list:
+    result = await session.execute(
+        select(func.count()).where(or_(Lexeme.text.like(f'{prefix}%'), Lexeme.text.like(f'% {prefix}%')))
+    )
+    return [None] * result.scalar()
+
+
+async def fts_count(session, user_id: int, prefix: str) -> list:
+    result = await session.execute(
+        text("SELECT count(*) FROM lexemes_fts WHERE lexemes_fts MATCH :match"),
+        {'match': f'"{prefix}"*'}
+    )
+    return [None] * result.scalar()
+
+
+async def like_user(session, user_id: int, prefix: str) -> list:
+    result = await session.execute(
+        select(UserWord.id, Lexeme.text)
+        .join(Lexeme, Lexeme.id == UserWord.lexeme_id)
+        .where(UserWord.user_id == user_id, Lexeme.text.like(f'{prefix}%'))
+        .limit(50)
+    )
+    return result.all()
+
+
+async def fts_user(session, user_id: int, prefix: str) -> list:
+    return await WordService(session).search(user_id, prefix, 'prefix', limit=50)
+
+
+async def main(environment: str, rows: int, users: int, queries_count: int, syllables: int):
+    rng = random.Random(7)
+    queries = [(rng.randint(1, users), ''.join(rng.choice(SYLLABLES) for _ in range(syllables)))
+               for _ in range(queries_count)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(os.path.join(directory, 'words.db'), config[environment].SQLITE_PRAGMAS)
+
+        started = time.perf_counter()
+        await prepare(engine, rows, users)
+        print(f"Prepared {rows} lexemes for {users} users in {time.perf_counter() - started:.1f}s")
+
+        print(f"{'search':<24} {'ms/query':>10} {'found':>8}")
+        for name, run in (('LIKE, first page', like_global), ('FTS5, first page', fts_global),
+                          ('FTS5 ranked, first page', fts_global_ranked),
+                          ('LIKE, count', like_count), ('FTS5, count', fts_count),
+                          ('LIKE, user words', like_user), ('FTS5, user words', fts_user)):
+            elapsed, found = await measure(engine, queries, run)
+            print(f"{name:<24} {elapsed:>10.2f} {found:>8.1f}")
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare LIKE scans with the FTS5 index of the lexemes")
+    parser.add_argument("--environment", default="production", help="Config environment to take the profile from")
+    parser.add_argument("--rows", type=int, default=1000000, help="Number of lexemes, each saved by one user")
+    parser.add_argument("--users", type=int, default=1000, help="Number of users")
+    parser.add_argument("--queries", type=int, default=200, help="Number of searched prefixes")
+    parser.add_argument("--syllables", type=int, default=3, help="Length of the searched prefixes in syllables")
+
+    args = parser.parse_args()
+    asyncio.run(main(args.environment, args.rows, args.users, args.queries, args.syllables))
@@ -9,6 +9,7 @@ class Config:
 
     # common configuration for all environments
     LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    TESTING = False
 
     # localization
     DEFAULT_LANGUAGE = 'en'
@@ -17,12 +18,90 @@ class Config:
     # admin functions
     INITIAL_ADMINS = os.environ.get('INITIAL_ADMINS', '').split(',')
 
+    # sqlite tuning profile, applied on every new connection
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+        'cache_size': -16000,  # in KiB
+        'mmap_size': 64 * 1024 * 1024,
+        'foreign_keys': 'ON',  # ON DELETE CASCADE of the user rows
+    }
+    SQLITE_WAL_CHECKPOINT_INTERVAL = 300
+    SQLITE_WAL_CHECKPOINT_MODE = 'PASSIVE'
+
+    # number of read-only connections serving the read path
+    DATABASE_READ_POOL_SIZE = 4
+
+    # SQL instrumentation, statements are attributed to the update they are executed for
+    SQL_SLOW_QUERY_THRESHOLD = 0.1  # in seconds, logged with the query plan
+    SQL_N_PLUS_ONE_THRESHOLD = 5  # executions of the same statement within one update
+
+    # group commit of small high-frequency writes
+    WRITE_BATCH_FLUSH_INTERVAL = 0.01
+    WRITE_BATCH_MAX_SIZE = 500
+
+    # seconds between checks of the active documents cache version
+    DOCUMENT_CACHE_CHECK_INTERVAL = 5
+
+    # displayed messages tracking
+    MESSAGE_TRACKER_MAX_CHATS = 10000
+    MESSAGE_TRACKER_MAX_MESSAGES_PER_CHAT = 20
+
+    # incoming flood protection: (tokens per second, burst, max delay in seconds) per profile,
+    # selected by the "throttling" flag of a handler or by the name of its router
+    THROTTLING_IDLE_TTL = 600
+    THROTTLING_LIMITS = {
+        'default': (1.0, 5, 0.5),
+        'common': (1.0, 5, 0.5),
+        'registration': (2.0, 10, 1.0),
+        'ai': (0.1, 2, 0.0),
+        'vocabulary': (5.0, 20, 0.0),
+    }
+
+    # duplicate updates protection
+    UPDATE_DEDUP_WINDOW = 4096
+    UPDATE_DEDUP_PERSIST_EVERY = 1
+
+    # FSM states garbage collection
+    FSM_STATE_IDLE_TTL = 24 * 60 * 60
+    FSM_STATE_MAX_ENTRIES = 100000
+    FSM_STATE_SWEEP_INTERVAL = 60
+
+    # inline vocabulary search
+    WORD_INDEX_MAX_USERS = 1000
+    INLINE_RESULTS_PER_PAGE = 50
+    INLINE_CACHE_TIME = 30
+
+    # words import from files
+    WORD_IMPORT_MAX_FILE_SIZE = 20 * 1024 * 1024  # the Bot API download limit
+    WORD_IMPORT_BATCH_SIZE = 1000
+    WORD_IMPORT_PROGRESS_INTERVAL = 2
+
+    # saved words navigator
+    WORDS_PAGE_SIZE = 10
+
+    # account erasure, the rows of a user are deleted in chunks of short write transactions
+    ACCOUNT_ERASURE_CHUNK_SIZE = 2000
+
+    # expiry of trials and subscriptions, only the users expired since the last run are scanned
+    EXPIRY_JOB_INTERVAL = 60
+    EXPIRY_CHUNK_SIZE = 500
+    EXPIRY_CATCH_UP = 24 * 60 * 60  # seconds before the first run the expiries are processed from
+
+    # messages sent outside of the update handling, e.g. notifications of the scheduled jobs
+    OUTBOUND_MESSAGES_PER_SECOND = 25
+    OUTBOUND_QUEUE_SIZE = 10000
+
+    # seconds the snapshot of the active promo codes is served for
+    PROMO_CODE_CACHE_TTL = 30
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
-    TESTING = False
     LOG_LEVEL = 'DEBUG'
-    DATABASE_URI=f'sqlite+aiosqlite:///{BASE_DIR}/developer/database/database_dev.sql?charset=utf8mb4'
+    DATABASE_URI=f'sqlite+aiosqlite:///{BASE_DIR}/developer/database/database_dev.sql'
 
     # telegram bot configuration
     POLLING_TIMEOUT = 10
@@ -32,7 +111,12 @@ class TestingConfig(Config):
     TESTING = True
     DEBUG = True
     LOG_LEVEL = 'DEBUG'
-    DATABASE_URI=f'sqlite+aiosqlite:///{BASE_DIR}/developer/database/database_test.sql?charset=utf8mb4'
+    DATABASE_URI=f'sqlite+aiosqlite:///{BASE_DIR}/developer/database/database_test.sql'
+    SQLITE_PRAGMAS = {
+        **Config.SQLITE_PRAGMAS,
+        'synchronous': 'OFF',
+        'mmap_size': 0,
+    }
 
     # telegram bot configuration
     POLLING_TIMEOUT = 1
@@ -41,7 +125,13 @@ class TestingConfig(Config):
 class ProductionConfig(Config):
     DEBUG = False
     LOG_LEVEL = 'INFO'
-    DATABASE_URI=os.environ.get('DATABASE_URI') or f'sqlite+aiosqlite:///{BASE_DIR}/developer/database/database.sql?charset=utf8mb4'
+    DATABASE_URI=os.environ.get('DATABASE_URI') or f'sqlite+aiosqlite:///{BASE_DIR}/developer/database/database.sql'
+    SQLITE_PRAGMAS = {
+        **Config.SQLITE_PRAGMAS,
+        'cache_size': -64000,  # in KiB
+        'mmap_size': 256 * 1024 * 1024,
+    }
+    SQLITE_WAL_CHECKPOINT_INTERVAL = 60
 
     #telegram bot configuration
     POLLING_TIMEOUT = 30
@@ -1,8 +1,13 @@
 from .telegram import developer_dispatcher, developer_bot, initialize_telegram_bot
 from .database import initialize_database, close_database
+from .services import language_catalog_manager, account_eraser
+from .scheduler import job_scheduler, expiry_job_runner
+from .telegram.common.outbound import outbound_sender
+from config import get_config
 import logging
 
 logger = logging.getLogger(__name__)
+Config = get_config()
 
 # initialization of the application
 async def initialize_application():
@@ -11,6 +16,16 @@ async def initialize_application():
         await initialize_database()
         logger.info("Database initialized")
 
+        await language_catalog_manager.refresh()
+        logger.info("Language catalog loaded")
+
+        await account_eraser.start()
+
+        # scheduled jobs, their notifications are sent by the outbound sender
+        outbound_sender.start(developer_bot)
+        job_scheduler.add_job("expiry", expiry_job_runner.run, Config.EXPIRY_JOB_INTERVAL)
+        job_scheduler.start()
+
         await initialize_telegram_bot()
         await developer_dispatcher.start_polling(developer_bot)
         logger.info("Telegram bot started")
@@ -24,5 +39,8 @@ async def initialize_application():
 
     finally:
         logger.info("Closing the application")
+        await job_scheduler.stop()
+        await outbound_sender.stop()
+        await account_eraser.stop()
         await close_database()
         logger.info("Database connection closed")
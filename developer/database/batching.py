@@ -0,0 +1,231 @@
+from sqlalchemy import insert, Table
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import asyncio
+import logging
+
+from config import get_config
+from .session import db_manager
+
+logger = logging.getLogger(__name__)
+Config = get_config()
+
+
+@dataclass
+class PendingWrite:
+    statement: Any
+    params: Dict[str, Any]
+    future: asyncio.Future
+    returning: bool = False
+    # token shared by the writes submitted as one unit
+    unit: Optional[object] = None
+
+
+class WriteBatcher:
+    """
+    Write-behind batcher collecting small inserts and updates from many handlers and
+    flushing them in a single transaction every ``flush_interval`` seconds or as soon
+    as ``max_batch_size`` writes are pending.
+
+    Every submitted write returns a future which is resolved once the transaction
+    holding it is committed (with the inserted primary key for inserts), or fails
+    with the error of that write. Writes sharing the same statement are sent with
+    one executemany call. Writes submitted as a unit are committed or fail together.
+    """
+    def __init__(
+            self,
+            session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]] = None,
+            flush_interval: float = 0.01,
+            max_batch_size: int = 500
+    ) -> None:
+        self.session_factory = session_factory or db_manager.get_write_session
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+
+        self._pending: List[PendingWrite] = []
+        self._insert_statements: Dict[Table, Any] = {}
+        self._batch_full = asyncio.Event()
+        self._flusher_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # metrics
+        self.flushed_batches = 0
+        self.flushed_writes = 0
+
+    # ========== SUBMITTING WRITES ==========
+
+    def submit(self, statement: Any, params: Dict[str, Any], returning: bool = False) -> asyncio.Future:
+        """
+        Queue a write, statements are grouped by identity, so reuse the same statement object
+
+        :param statement: Core insert or update statement
+        :param params: parameters of the statement
+        :param returning: whether the statement returns the inserted primary key
+        :return: future resolved after the commit
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue(PendingWrite(statement, params, future, returning))
+        return future
+
+    def submit_unit(self, writes: Sequence[Tuple[Any, Dict[str, Any], bool]]) -> List[asyncio.Future]:
+        """
+        Queue writes which are committed in the same transaction, in the given order. If the
+        batch fails, the unit is retried on its own and all its writes fail together
+
+        :param writes: (statement, params, returning) of every write
+        :return: futures of the writes, resolved after the commit
+        """
+        loop = asyncio.get_running_loop()
+        unit = object()
+
+        futures = []
+        for statement, params, returning in writes:
+            future = loop.create_future()
+            self._queue(PendingWrite(statement, params, future, returning, unit))
+            futures.append(future)
+
+        return futures
+
+    def _queue(self, pending_write: PendingWrite) -> None:
+        self._pending.append(pending_write)
+
+        if self._flusher_task is None:
+            # no background flusher, e.g. in scripts, so every write is flushed right away
+            asyncio.ensure_future(self.flush())
+
+        elif len(self._pending) >= self.max_batch_size:
+            self._batch_full.set()
+
+    def _get_insert_statement(self, table: Table) -> Any:
+        statement = self._insert_statements.get(table)
+        if statement is None:
+            statement = insert(table).returning(*table.primary_key.columns, sort_by_parameter_order=True)
+            self._insert_statements[table] = statement
+
+        return statement
+
+    async def insert(self, model_or_table: Union[type, Table], **values) -> Any:
+        """
+        Insert a row through the batcher
+
+        :param model_or_table: ORM model or Core table
+        :param values: column values
+        :return: primary key of the inserted row, once it is committed
+        """
+        table = getattr(model_or_table, '__table__', model_or_table)
+        return await self.submit(self._get_insert_statement(table), values, returning=True)
+
+    async def execute(self, statement: Any, **params) -> None:
+        await self.submit(statement, params)
+
+    # ========== FLUSHING ==========
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+
+        batch, self._pending = self._pending, []
+        self._batch_full.clear()
+
+        try:
+            await self._write(batch)
+
+        except Exception as e:
+            # isolating the failing writes, each of the others or each unit is committed on its own
+            logger.warning(f"Batch of {len(batch)} writes failed, retrying one by one: {e}")
+            for unit in self._split_units(batch):
+                try:
+                    await self._write(unit)
+
+                except Exception as write_error:
+                    for pending_write in unit:
+                        if not pending_write.future.done():
+                            pending_write.future.set_exception(write_error)
+
+        self.flushed_batches += 1
+        self.flushed_writes += len(batch)
+        return len(batch)
+
+    @staticmethod
+    def _split_units(batch: List[PendingWrite]) -> List[List[PendingWrite]]:
+        # the writes of a unit are queued together, so they are consecutive
+        units = []
+        for pending_write in batch:
+            if units and pending_write.unit is not None and units[-1][0].unit is pending_write.unit:
+                units[-1].append(pending_write)
+
+            else:
+                units.append([pending_write])
+
+        return units
+
+    async def _write(self, batch: List[PendingWrite]) -> None:
+        results = []
+
+        async with self.session_factory() as session:
+            # consecutive writes of the same statement go in one executemany call
+            start = 0
+            while start < len(batch):
+                end = start + 1
+                while end < len(batch) and batch[end].statement is batch[start].statement:
+                    end += 1
+
+                group = batch[start:end]
+                result = await session.execute(group[0].statement, [item.params for item in group])
+
+                if group[0].returning:
+                    results.extend(zip(group, [row[0] for row in result.all()]))
+
+                else:
+                    results.extend((item, None) for item in group)
+
+                start = end
+
+            await session.commit()
+
+        for pending_write, value in results:
+            if not pending_write.future.done():
+                pending_write.future.set_result(value)
+
+    async def _run_flusher(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), timeout=self.flush_interval)
+
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await self.flush()
+
+            except Exception as e:
+                logger.error(f"Error flushing batched writes: {e}")
+
+    def start(self) -> None:
+        if self._flusher_task is not None:
+            logger.warning("Write batcher already started")
+            return
+
+        self._stopping = False
+        self._flusher_task = asyncio.create_task(self._run_flusher())
+        logger.info("Write batcher started")
+
+    async def stop(self) -> None:
+        if self._flusher_task is not None:
+            # letting the flusher finish the batch it may be writing
+            self._stopping = True
+            self._batch_full.set()
+            await self._flusher_task
+            self._flusher_task = None
+
+        # committing everything still pending
+        await self.flush()
+        logger.info("Write batcher stopped")
+
+
+write_batcher = WriteBatcher(
+    flush_interval=Config.WRITE_BATCH_FLUSH_INTERVAL,
+    max_batch_size=Config.WRITE_BATCH_MAX_SIZE
+)
@@ -0,0 +1,229 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, default
+from sqlalchemy.ext.asyncio import AsyncEngine
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Union
+from config import get_config
+import logging
+
+Config = get_config()
+
+logger = logging.getLogger(__name__)
+
+# how an execution was served by the compiled SQL cache, see ExecutionContext.cache_hit
+CACHE_OUTCOMES = {
+    default.CACHE_HIT: 'hit',
+    default.CACHE_MISS: 'miss',
+    default.CACHING_DISABLED: 'disabled',
+    default.NO_CACHE_KEY: 'no_key',
+    default.NO_DIALECT_SUPPORT: 'no_dialect_support',
+}
+
+
+class StatementCacheStats:
+    """
+    Counts the executions served from SQLAlchemy's compiled SQL cache.
+
+    A statement is compiled once per cache key, so after the warm-up every execution of a
+    cached statement should be a hit. Statements missing over and over are built with
+    varying structure (e.g. literal values or a varying number of criteria) and are
+    counted by their SQL in ``missed_statements``.
+    """
+    def __init__(self) -> None:
+        self.outcomes: Counter = Counter()
+        self.missed_statements: Counter = Counter()
+
+    def attach(self, engine: Union[Engine, AsyncEngine]) -> None:
+        sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+        event.listen(sync_engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _after_cursor_execute(self, connection, cursor, statement, parameters, context, executemany) -> None:
+        if context is None:
+            return
+
+        outcome = CACHE_OUTCOMES.get(context.cache_hit, 'unknown')
+        self.outcomes[outcome] += 1
+
+        if outcome == 'miss':
+            self.missed_statements[" ".join(statement.split())] += 1
+
+    @property
+    def hit_ratio(self) -> float:
+        cached = self.outcomes['hit'] + self.outcomes['miss']
+        return self.outcomes['hit'] / cached if cached else 0.0
+
+    @staticmethod
+    def get_cache_size(engine: Union[Engine, AsyncEngine]) -> int:
+        """
+        Number of compiled statements held in the cache of the engine
+        """
+        sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+        compiled_cache = getattr(sync_engine, '_compiled_cache', None)
+        return len(compiled_cache) if compiled_cache is not None else 0
+
+    def summary(self) -> Dict[str, Union[int, float]]:
+        return {**{outcome: self.outcomes[outcome] for outcome in CACHE_OUTCOMES.values()},
+                'hit_ratio': round(self.hit_ratio, 4)}
+
+    def reset(self) -> None:
+        self.outcomes.clear()
+        self.missed_statements.clear()
+
+
+# creating global statement cache statistics
+statement_cache_stats = StatementCacheStats()
+
+
+# ========== PER-UPDATE QUERY SCOPES ==========
+
+@dataclass
+class QueryScope:
+    """
+    The statements executed while one update (or another unit of work) is processed
+    """
+    name: str
+    # the totals key of the scope if no handler is resolved for it
+    label: str
+    handler: Optional[str] = None
+    queries: int = 0
+    duration: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+
+@dataclass
+class QueryTotals:
+    scopes: int = 0
+    queries: int = 0
+    duration: float = 0.0
+
+
+# the scope of the running task, statements executed outside of any scope (e.g. by the
+# write batcher or the background jobs) are counted in the totals only
+current_query_scope: ContextVar[Optional[QueryScope]] = ContextVar('current_query_scope', default=None)
+
+
+class QueryInstrumentation:
+    """
+    Attributes every executed statement to the current query scope, opened per update by
+    the QueryScopeMiddleware, and records the number and the duration of the statements.
+
+    Statements running longer than ``slow_query_threshold`` seconds are logged with their
+    query plan, statements executed ``n_plus_one_threshold`` times or more within one scope
+    are logged as N+1 candidates once the scope is closed.
+    """
+    # statements the query plan is logged for
+    EXPLAINED_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+    def __init__(self, slow_query_threshold: float = 0.1, n_plus_one_threshold: int = 5) -> None:
+        self.slow_query_threshold = slow_query_threshold
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+        # totals by the handler name, or by the label of the scope if no handler was resolved
+        self.totals: Dict[str, QueryTotals] = {}
+        self.queries = 0
+        self.slow_queries = 0
+
+    def attach(self, engine: Union[Engine, AsyncEngine]) -> None:
+        sync_engine = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+        event.listen(sync_engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(sync_engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    # ========== ENGINE EVENTS ==========
+
+    @staticmethod
+    def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany) -> None:
+        if context is not None:
+            context._query_started_at = perf_counter()
+
+    def _after_cursor_execute(self, connection, cursor, statement, parameters, context, executemany) -> None:
+        started_at = getattr(context, '_query_started_at', None)
+        if started_at is None:
+            return
+
+        duration = perf_counter() - started_at
+        self.queries += 1
+
+        scope = current_query_scope.get()
+        if scope is not None:
+            scope.queries += 1
+            scope.duration += duration
+            if not executemany:
+                scope.statements[statement] += 1
+
+        if duration >= self.slow_query_threshold:
+            self.slow_queries += 1
+            self._log_slow_query(connection, statement, parameters, duration, executemany, scope)
+
+    @staticmethod
+    def _explain(connection, statement: str, parameters) -> List[str]:
+        # a cursor of its own, the results of the explained statement are not fetched yet
+        cursor = connection.connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [row[-1] for row in cursor.fetchall()]
+
+        finally:
+            cursor.close()
+
+    def _log_slow_query(self, connection, statement: str, parameters, duration: float, executemany: bool,
+                        scope: Optional[QueryScope]) -> None:
+        plan = []
+        if (connection.dialect.name == 'sqlite' and not executemany
+                and statement.lstrip()[:6].upper() in self.EXPLAINED_STATEMENTS):
+            try:
+                plan = self._explain(connection, statement, parameters)
+
+            except Exception as e:
+                logger.debug(f"Could not explain the slow query: {e}")
+
+        where = f" in {scope.handler or scope.name}" if scope is not None else ""
+        logger.warning(f"Slow query{where} ({duration * 1000:.1f} ms): {' '.join(statement.split())}"
+                       + (f" | plan: {'; '.join(plan)}" if plan else ""))
+
+    # ========== SCOPES ==========
+
+    @contextmanager
+    def scope(self, name: str, label: Optional[str] = None) -> Iterator[QueryScope]:
+        """
+        Attribute the statements executed in the block (and in the tasks it awaits) to a scope
+
+        :param name: name of the scope, e.g. "update 123"
+        :param label: key of the totals if no handler is resolved, the name by default,
+            so it has to stay the same for all the scopes of a kind, e.g. "unhandled message"
+        :return: the scope, its handler may be set once it is resolved
+        """
+        query_scope = QueryScope(name, label or name)
+        token = current_query_scope.set(query_scope)
+
+        try:
+            yield query_scope
+
+        finally:
+            current_query_scope.reset(token)
+            self._close_scope(query_scope)
+
+    def _close_scope(self, scope: QueryScope) -> None:
+        label = scope.handler or scope.label
+
+        totals = self.totals.setdefault(label, QueryTotals())
+        totals.scopes += 1
+        totals.queries += scope.queries
+        totals.duration += scope.duration
+
+        if scope.queries:
+            logger.debug(f"{scope.name} ({label}): {scope.queries} queries in {scope.duration * 1000:.1f} ms")
+
+        for statement, count in scope.statements.items():
+            if count >= self.n_plus_one_threshold:
+                logger.warning(f"N+1 candidate in {label}: {count} executions of {' '.join(statement.split())}")
+
+
+# creating global query instrumentation
+query_instrumentation = QueryInstrumentation(
+    slow_query_threshold=Config.SQL_SLOW_QUERY_THRESHOLD,
+    n_plus_one_threshold=Config.SQL_N_PLUS_ONE_THRESHOLD
+)
@@ -0,0 +1,33 @@
+from sqlalchemy.orm import selectinload, joinedload
+from .models import User, Language, LanguageTranslation, UserAgreement, PrivacyPolicy, UserWord
+
+# Named loader profiles. Relationships are never loaded implicitly (see RELATIONSHIP_LOADING
+# in the models), so every service method returning ORM objects passes the profile of the
+# relationships its callers read, e.g. ``select(Language).options(*LANGUAGE_WITH_NAMES)``.
+# An access outside of the loaded profile raises instead of issuing a query.
+
+# a language with its names in every locale, as read by Language.get_name
+LANGUAGE_WITH_NAMES = (
+    selectinload(Language.translations).selectinload(LanguageTranslation.locale),
+)
+
+# a user agreement with its language, as read by UserAgreement.language_code
+AGREEMENT_WITH_LANGUAGE = (
+    selectinload(UserAgreement.agreement_language),
+)
+
+# a privacy policy with its language, as read by PrivacyPolicy.language_code
+POLICY_WITH_LANGUAGE = (
+    selectinload(PrivacyPolicy.policy_language),
+)
+
+# a saved word with its lexeme, as read by UserWord.word
+USER_WORD_WITH_LEXEME = (
+    joinedload(UserWord.lexeme),
+)
+
+# a user with the interface language and its names, as read by User.language_code
+# and User.get_interface_language_name
+USER_WITH_INTERFACE_LANGUAGE = (
+    joinedload(User.interface_language).selectinload(Language.translations).selectinload(LanguageTranslation.locale),
+)
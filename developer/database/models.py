@@ -1,16 +1,24 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Float, Table
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, ForeignKey, Float, Text, Table, DDL, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.schema import UniqueConstraint, Index
 
+from config import get_config
 from .session import Base
 
+Config = get_config()
+
+# relationships are never loaded implicitly, every query opts into the relationships it needs
+# with a profile of developer.database.loader_profiles. The testing mode also fails the
+# accesses the identity map could answer without SQL
+RELATIONSHIP_LOADING = "raise" if Config.TESTING else "raise_on_sql"
+
 
 # table for many-to-many relations of users learning languages and learning languages
 user_learning_languages = Table(
     'user_learning_languages',
     Base.metadata,
-    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
     Column('language_id', Integer, ForeignKey('languages.id'), primary_key=True),
     Column('started_learning_at', DateTime, server_default=func.now(), nullable=False),
     Column('finished_learning_at', DateTime, nullable=True),
@@ -54,32 +62,48 @@ class User(Base):
     # subscription data
     is_always_free_of_charge = Column(Boolean, nullable=False, default=False)
     trial_starts_at = Column(DateTime, nullable=True)
-    trial_ends_at = Column(DateTime, nullable=True)
+    trial_ends_at = Column(DateTime, nullable=True, index=True)
     payment_confirmed = Column(Boolean, nullable=False, default=False)
     subscription_type = Column(String(20), nullable=True)
     subscription_starts_at = Column(DateTime, nullable=True)
-    subscription_ends_at = Column(DateTime, nullable=True)
+    subscription_ends_at = Column(DateTime, nullable=True, index=True)
     subscription_autorenew = Column(Boolean, nullable=False, default=False)
     subscription_cancelled_at = Column(DateTime, nullable=True)
 
+    # account erasure, a requested erasure is resumed after a restart until the user row is deleted
+    erasure_requested_at = Column(DateTime, nullable=True, index=True)
+
     # relationships
-    tokens = relationship("Token", back_populates="user", cascade="all, delete-orphan")
-    words = relationship("Word", back_populates="user", cascade="all, delete-orphan")
-    payments = relationship("Payment", back_populates="user", cascade="all, delete-orphan")
+    # the rows of a deleted user are deleted by the database (ON DELETE CASCADE), not loaded by the ORM
+    tokens = relationship("Token", back_populates="user", cascade="all, delete-orphan", passive_deletes=True,
+                          lazy=RELATIONSHIP_LOADING)
+    words = relationship("UserWord", back_populates="user", cascade="all, delete-orphan", passive_deletes=True,
+                         lazy=RELATIONSHIP_LOADING)
+    payments = relationship("Payment", back_populates="user", cascade="all, delete-orphan", passive_deletes=True,
+                            lazy=RELATIONSHIP_LOADING)
+    token_usage_days = relationship("TokenUsageDaily", back_populates="user", cascade="all, delete-orphan",
+                                    passive_deletes=True, lazy=RELATIONSHIP_LOADING)
 
     # relationships with user agreements and privacy policies
-    accepted_agreement = relationship("UserAgreement", foreign_keys="User.accepted_agreement_id", post_update=True)
-    accepted_privacy_policy = relationship("PrivacyPolicy", foreign_keys="User.accepted_privacy_policy_id", post_update=True)
+    accepted_agreement = relationship("UserAgreement", foreign_keys="User.accepted_agreement_id", post_update=True,
+                                      lazy=RELATIONSHIP_LOADING)
+    accepted_privacy_policy = relationship("PrivacyPolicy", foreign_keys="User.accepted_privacy_policy_id", post_update=True,
+                                           lazy=RELATIONSHIP_LOADING)
 
     # relationships for agreements and privacy policies administration
-    activated_agreements = relationship("UserAgreement", foreign_keys="UserAgreement.activated_by_id", back_populates="activated_by")
-    activated_privacy_policies = relationship("PrivacyPolicy", foreign_keys="PrivacyPolicy.activated_by_id", back_populates="activated_by")
-    deactivated_agreements = relationship("UserAgreement", foreign_keys="UserAgreement.deactivated_by_id", back_populates="deactivated_by")
-    deactivated_privacy_policies = relationship("PrivacyPolicy", foreign_keys="PrivacyPolicy.deactivated_by_id", back_populates="deactivated_by")
+    # the references of a deleted user are set to NULL by the database (ON DELETE SET NULL)
+    activated_agreements = relationship("UserAgreement", foreign_keys="UserAgreement.activated_by_id", back_populates="activated_by",
+                                        passive_deletes=True, lazy=RELATIONSHIP_LOADING)
+    activated_privacy_policies = relationship("PrivacyPolicy", foreign_keys="PrivacyPolicy.activated_by_id", back_populates="activated_by",
+                                              passive_deletes=True, lazy=RELATIONSHIP_LOADING)
+    deactivated_agreements = relationship("UserAgreement", foreign_keys="UserAgreement.deactivated_by_id", back_populates="deactivated_by",
+                                          passive_deletes=True, lazy=RELATIONSHIP_LOADING)
+    deactivated_privacy_policies = relationship("PrivacyPolicy", foreign_keys="PrivacyPolicy.deactivated_by_id", back_populates="deactivated_by",
+                                                passive_deletes=True, lazy=RELATIONSHIP_LOADING)
 
     # property for receiving language_code
     # many-to-one
-    interface_language = relationship("Language", back_populates="interface_users")
+    interface_language = relationship("Language", back_populates="interface_users", lazy=RELATIONSHIP_LOADING)
 
     @property
     def language_code(self):
@@ -91,6 +115,8 @@ class User(Base):
         "Language",
         secondary=user_learning_languages,
         back_populates="learning_users",
+        passive_deletes=True,
+        lazy=RELATIONSHIP_LOADING,
     )
 
     # receiving interface language name in the current locale
@@ -119,27 +145,32 @@ class Language(Base):
 
     # relationships for interface language
     # one-to-many
-    interface_users = relationship("User", back_populates="interface_language")
+    interface_users = relationship("User", back_populates="interface_language", lazy=RELATIONSHIP_LOADING)
 
     # relationships for studying languages
     # many-to-many
     learning_users = relationship(
         "User",
         secondary=user_learning_languages,
-        back_populates="learning_languages"
+        back_populates="learning_languages",
+        lazy=RELATIONSHIP_LOADING,
     )
 
     # relationships for user agreements and privacy policies
     # one-to-many
-    agreements = relationship("UserAgreement", back_populates="agreement_language")
-    privacy_policies = relationship("PrivacyPolicy", back_populates="policy_language")
+    agreements = relationship("UserAgreement", back_populates="agreement_language", lazy=RELATIONSHIP_LOADING)
+    privacy_policies = relationship("PrivacyPolicy", back_populates="policy_language", lazy=RELATIONSHIP_LOADING)
+
+    # relationship for vocabulary
+    # one-to-many
+    lexemes = relationship("Lexeme", back_populates="language", lazy=RELATIONSHIP_LOADING)
 
     # relationship for localization
     # one-to-many
     translations = relationship("LanguageTranslation",
                                 foreign_keys="LanguageTranslation.language_id",
                                 back_populates="language",
-                                cascade="all, delete-orphan")
+                                cascade="all, delete-orphan", lazy=RELATIONSHIP_LOADING)
 
     # getting language name in the current locale
     def get_name(self, locale_code: str = "en") -> str:
@@ -181,10 +212,10 @@ class LanguageTranslation(Base):
     # many-to-one
     language = relationship("Language",
                             foreign_keys=[language_id],
-                            back_populates="translations")
+                            back_populates="translations", lazy=RELATIONSHIP_LOADING)
 
     locale = relationship("Language",
-                          foreign_keys=[locale_id])
+                          foreign_keys=[locale_id], lazy=RELATIONSHIP_LOADING)
 
     # localization code for backward compatibility
     @property
@@ -204,6 +235,7 @@ class UserAgreement(Base):
 
     __table_args__ = (
         UniqueConstraint('version', 'agreement_language_id', name='unique_agreement_version_language_id'),
+        Index('ix_user_agreements_language_id_is_active', 'agreement_language_id', 'is_active'),
     )
 
     id = Column(Integer, primary_key=True)
@@ -213,20 +245,23 @@ class UserAgreement(Base):
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     is_active = Column(Boolean, nullable=False, default=False, index=True)
     activated_at = Column(DateTime, nullable=True)
-    activated_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    activated_by_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     deactivated_at = Column(DateTime, nullable=True)
-    deactivated_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    deactivated_by_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
 
     # relationships for administration
-    activated_by = relationship("User", foreign_keys="UserAgreement.activated_by_id", back_populates="activated_agreements")
-    deactivated_by = relationship("User", foreign_keys="UserAgreement.deactivated_by_id", back_populates="deactivated_agreements")
+    activated_by = relationship("User", foreign_keys="UserAgreement.activated_by_id", back_populates="activated_agreements",
+                                lazy=RELATIONSHIP_LOADING)
+    deactivated_by = relationship("User", foreign_keys="UserAgreement.deactivated_by_id", back_populates="deactivated_agreements",
+                                  lazy=RELATIONSHIP_LOADING)
 
     # users who accepted the agreement
-    users = relationship("User", foreign_keys="User.accepted_agreement_id", back_populates="accepted_agreement")
+    users = relationship("User", foreign_keys="User.accepted_agreement_id", back_populates="accepted_agreement",
+                         lazy=RELATIONSHIP_LOADING)
 
     # localization relationship
     # many-to-one
-    agreement_language = relationship("Language", back_populates="agreements")
+    agreement_language = relationship("Language", back_populates="agreements", lazy=RELATIONSHIP_LOADING)
 
     # property for receiving language_code
     @property
@@ -243,6 +278,7 @@ class PrivacyPolicy(Base):
 
     __table_args__ = (
         UniqueConstraint('version', 'policy_language_id', name='unique_privacy_policy_version_language_id'),
+        Index('ix_privacy_policies_language_id_is_active', 'policy_language_id', 'is_active'),
     )
 
     id = Column(Integer, primary_key=True)
@@ -252,20 +288,23 @@ class PrivacyPolicy(Base):
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     is_active = Column(Boolean, nullable=False, default=False, index=True)
     activated_at = Column(DateTime, nullable=True)
-    activated_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    activated_by_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     deactivated_at = Column(DateTime, nullable=True)
-    deactivated_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    deactivated_by_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
 
     # relationships for administration
-    activated_by = relationship("User", foreign_keys="PrivacyPolicy.activated_by_id", back_populates="activated_privacy_policies")
-    deactivated_by = relationship("User", foreign_keys="PrivacyPolicy.deactivated_by_id", back_populates="deactivated_privacy_policies")
+    activated_by = relationship("User", foreign_keys="PrivacyPolicy.activated_by_id", back_populates="activated_privacy_policies",
+                                lazy=RELATIONSHIP_LOADING)
+    deactivated_by = relationship("User", foreign_keys="PrivacyPolicy.deactivated_by_id", back_populates="deactivated_privacy_policies",
+                                  lazy=RELATIONSHIP_LOADING)
 
     # users who accepted the privacy policy
-    users = relationship("User", foreign_keys="User.accepted_privacy_policy_id", back_populates="accepted_privacy_policy")
+    users = relationship("User", foreign_keys="User.accepted_privacy_policy_id", back_populates="accepted_privacy_policy",
+                         lazy=RELATIONSHIP_LOADING)
 
     # relationship for localization
     # many-to-one
-    policy_language = relationship("Language", back_populates="privacy_policies")
+    policy_language = relationship("Language", back_populates="privacy_policies", lazy=RELATIONSHIP_LOADING)
 
     # property for receiving language_code
     @property
@@ -278,43 +317,148 @@ class PrivacyPolicy(Base):
                f"is_active={self.is_active}, activated_at={self.activated_at}, deactivated_at={self.deactivated_at})>"
 
 
-class Word(Base):
-    __tablename__ = "words"
+class Lexeme(Base):
+    __tablename__ = "lexemes"
+
+    __table_args__ = (
+        UniqueConstraint('language_id', 'normalized', name='unique_lexeme_language_id_normalized'),
+    )
 
+    # a word shared by all users learning the language, the place for any enrichment of it
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    word = Column(String(100), nullable=False)
+    language_id = Column(Integer, ForeignKey("languages.id"), nullable=False)
+    normalized = Column(String(100), nullable=False)
+    text = Column(String(100), nullable=False)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
 
+    #relationships
+    language = relationship("Language", back_populates="lexemes", lazy=RELATIONSHIP_LOADING)
+    user_words = relationship("UserWord", back_populates="lexeme", lazy=RELATIONSHIP_LOADING)
+
+    def __repr__(self):
+        return f"<Lexeme(id={self.id}, language_id={self.language_id}, text={self.text})>"
+
+
+# full-text index over the lexemes, an external content FTS5 table kept in sync by triggers.
+# the update trigger only fires on text changes, the no-op upsert of an existing lexeme leaves it alone
+LEXEMES_FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS lexemes_fts USING fts5(
+        text, content='lexemes', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS lexemes_fts_after_insert AFTER INSERT ON lexemes
+    BEGIN
+        INSERT INTO lexemes_fts (rowid, text) VALUES (NEW.id, NEW.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS lexemes_fts_after_delete AFTER DELETE ON lexemes
+    BEGIN
+        INSERT INTO lexemes_fts (lexemes_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS lexemes_fts_after_update AFTER UPDATE OF text ON lexemes
+    BEGIN
+        INSERT INTO lexemes_fts (lexemes_fts, rowid, text) VALUES ('delete', OLD.id, OLD.text);
+        INSERT INTO lexemes_fts (rowid, text) VALUES (NEW.id, NEW.text);
+    END
+    """,
+)
+
+for statement in LEXEMES_FTS_DDL:
+    event.listen(Lexeme.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+event.listen(Lexeme.__table__, "before_drop", DDL("DROP TABLE IF EXISTS lexemes_fts").execute_if(dialect="sqlite"))
+
+
+class UserWord(Base):
+    __tablename__ = "user_words"
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'lexeme_id', name='unique_user_word_user_id_lexeme_id'),
+        Index('ix_user_words_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    lexeme_id = Column(Integer, ForeignKey("lexemes.id"), nullable=False, index=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
 
     #relationships
-    user = relationship("User", back_populates="words")
+    user = relationship("User", back_populates="words", lazy=RELATIONSHIP_LOADING)
+    lexeme = relationship("Lexeme", back_populates="user_words", lazy=RELATIONSHIP_LOADING)
+
+    # property for receiving the word itself
+    @property
+    def word(self):
+        return self.lexeme.text if self.lexeme else None
 
     def __repr__(self):
-        return f"<Word(id={self.id}, word={self.word}, user_id={self.user_id})>"
+        return f"<UserWord(id={self.id}, user_id={self.user_id}, lexeme_id={self.lexeme_id})>"
 
 
 class Token(Base):
     __tablename__ = "tokens"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     token_count = Column(Integer, nullable=False, default=0)
     cost = Column(Float, nullable=False, default=0.0)
 
     #relationships
-    user = relationship("User", back_populates="tokens")
+    user = relationship("User", back_populates="tokens", lazy=RELATIONSHIP_LOADING)
 
     def __repr__(self):
         return f"<Token(id={self.id}, user_id={self.user_id})>"
 
 
+class TokenUsageDaily(Base):
+    __tablename__ = "token_usage_daily"
+
+    # rollup of the tokens table, maintained by the trigger below
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    token_count = Column(Integer, nullable=False, default=0)
+    cost = Column(Float, nullable=False, default=0.0)
+    calls = Column(Integer, nullable=False, default=0)
+
+    #relationships
+    user = relationship("User", back_populates="token_usage_days", lazy=RELATIONSHIP_LOADING)
+
+    def __repr__(self):
+        return (f"<TokenUsageDaily(user_id={self.user_id}, day={self.day}, token_count={self.token_count},"
+                f" cost={self.cost}, calls={self.calls})>")
+
+
+# every inserted token usage row is added to the daily rollup in the same transaction
+TOKEN_USAGE_DAILY_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS tokens_rollup_after_insert AFTER INSERT ON tokens
+BEGIN
+    INSERT INTO token_usage_daily (user_id, day, token_count, cost, calls)
+    VALUES (NEW.user_id, date(NEW.created_at), NEW.token_count, NEW.cost, 1)
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        token_count = token_count + excluded.token_count,
+        cost = cost + excluded.cost,
+        calls = calls + 1;
+END
+"""
+
+event.listen(
+    Token.__table__,
+    "after_create",
+    DDL(TOKEN_USAGE_DAILY_TRIGGER).execute_if(dialect="sqlite")
+)
+
+
 class Payment(Base):
     __tablename__ = "payments"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     provider = Column(String(20), nullable=False)
     payment_id = Column(String(256), nullable=False)
     amount = Column(Float, nullable=False)
@@ -325,7 +469,7 @@ class Payment(Base):
     completed_at = Column(DateTime, nullable=True)
 
     #relationships
-    user = relationship("User", back_populates="payments")
+    user = relationship("User", back_populates="payments", lazy=RELATIONSHIP_LOADING)
 
     def __repr__(self):
         return (f"<Payment(id={self.id}, user_id={self.user_id}, payment_id={self.payment_id},"
@@ -351,4 +495,54 @@ class PromoCode(Base):
         return f"<PromoCode(id={self.id}, code={self.code}, discount_percent={self.discount_percent}," \
                f" discount_amount={self.discount_amount}, uses_limit={self.uses_limit}, " \
                f"uses_count={self.uses_count}, valid_from={self.valid_from}, valid_until={self.valid_until}, " \
-               f"is_active={self.is_active}, created_at={self.created_at})>"
\ No newline at end of file
+               f"is_active={self.is_active}, created_at={self.created_at})>"
+
+
+class SchemaFingerprint(Base):
+    __tablename__ = "schema_fingerprint"
+
+    id = Column(Integer, primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    # the alembic revision the fingerprint was stored at, always the head of the migrations
+    head_revision = Column(String(32), nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return (f"<SchemaFingerprint(id={self.id}, fingerprint={self.fingerprint}, "
+                f"head_revision={self.head_revision}, created_at={self.created_at})>")
+
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<CacheVersion(name={self.name}, version={self.version}, updated_at={self.updated_at})>"
+
+
+class JobWatermark(Base):
+    __tablename__ = "job_watermarks"
+
+    # the last row processed by a scheduled job, as (processed_until, last_id) of its keyset
+    name = Column(String(50), primary_key=True)
+    processed_until = Column(DateTime, nullable=False)
+    last_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<JobWatermark(name={self.name}, processed_until={self.processed_until}, last_id={self.last_id})>"
+
+
+class DeduplicationWindow(Base):
+    __tablename__ = "deduplication_windows"
+
+    # the recently processed update ids of a bot, as dumped by UpdateWindow
+    bot_id = Column(Integer, primary_key=True, autoincrement=False)
+    data = Column(Text, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<DeduplicationWindow(bot_id={self.bot_id}, updated_at={self.updated_at})>"
@@ -0,0 +1,286 @@
+from sqlalchemy import event, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+import os
+import re
+import tempfile
+import logging
+
+from .models import (Base, User, Language, LanguageTranslation, UserAgreement, PrivacyPolicy, Lexeme, UserWord, Token,
+                     Payment, PromoCode, user_learning_languages)
+
+logger = logging.getLogger(__name__)
+
+# tables which grow with the number of users, a full scan of them is a bug
+LARGE_TABLES = ('users', 'lexemes', 'user_words', 'tokens', 'token_usage_daily', 'payments', 'user_learning_languages')
+
+# "SCAN tokens", "SCAN tokens USING COVERING INDEX ..." or "SCAN TABLE tokens" on older SQLite,
+# aliased tables are reported under the alias, e.g. "tokens_1"
+SCAN_PATTERN = re.compile(r'^SCAN (?:TABLE )?(\w+?)(?:_\d+)?(?: |$)')
+
+
+@dataclass
+class QueryPlan:
+    statement: str
+    plan: List[str]
+    full_scans: List[str] = field(default_factory=list)
+
+
+class QueryAuditor:
+    """
+    Captures the statements executed on an engine and checks their plans with
+    ``EXPLAIN QUERY PLAN``, reporting full scans of the large tables.
+    """
+    def __init__(self, engine: AsyncEngine, large_tables: Sequence[str] = LARGE_TABLES) -> None:
+        self.engine = engine
+        self.large_tables = set(large_tables)
+        self._statements: Dict[str, Any] = {}
+
+    def _before_cursor_execute(self, connection, cursor, statement, parameters, context, executemany) -> None:
+        if executemany or not statement.lstrip().upper().startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')):
+            return
+
+        # the plan depends on the statement only, the first parameters are enough to explain it
+        self._statements.setdefault(statement, parameters)
+
+    @asynccontextmanager
+    async def capture(self) -> AsyncIterator["QueryAuditor"]:
+        event.listen(self.engine.sync_engine, 'before_cursor_execute', self._before_cursor_execute)
+        try:
+            yield self
+
+        finally:
+            event.remove(self.engine.sync_engine, 'before_cursor_execute', self._before_cursor_execute)
+
+    async def explain(self) -> List[QueryPlan]:
+        plans = []
+
+        async with self.engine.connect() as connection:
+            for statement, parameters in self._statements.items():
+                result = await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                details = [row[-1] for row in result.all()]
+
+                full_scans = []
+                for detail in details:
+                    match = SCAN_PATTERN.match(detail)
+                    if match and match.group(1) in self.large_tables:
+                        full_scans.append(detail)
+
+                plans.append(QueryPlan(statement, details, full_scans))
+
+        return plans
+
+
+# ========== SEEDING ==========
+
+async def seed_database(session: AsyncSession, users: int = 1000, rows_per_user: int = 20) -> Dict[str, int]:
+    """
+    Fill an empty database with enough rows for the planner to prefer indexes over scans
+
+    :param session: session of the database to seed
+    :param users: number of users
+    :param rows_per_user: number of words, token usages and payments of every user
+    :return: the seeded ids and values used by the audited queries
+    """
+    now = datetime.now()
+
+    await session.execute(insert(Language), [
+        {'id': 1, 'code': 'en', 'is_interface_language': True, 'flag_code': 'gb'},
+        {'id': 2, 'code': 'ru', 'is_interface_language': True, 'flag_code': 'ru'},
+        {'id': 3, 'code': 'de', 'is_interface_language': False, 'flag_code': 'de'},
+    ])
+    await session.execute(insert(LanguageTranslation), [
+        {'language_id': language_id, 'locale_id': locale_id, 'name': f'language {language_id} in {locale_id}'}
+        for language_id in (1, 2, 3) for locale_id in (1, 2)
+    ])
+
+    for model, language_column in ((UserAgreement, 'agreement_language_id'), (PrivacyPolicy, 'policy_language_id')):
+        await session.execute(insert(model), [
+            {'version': f'1.{version}', language_column: language_id, 'url': f'https://example.com/{version}',
+             'is_active': version == 9}
+            for language_id in (1, 2) for version in range(10)
+        ])
+
+    # the trials and subscriptions of the first users ended, so the expiry job has users to process
+    await session.execute(insert(User), [
+        {'id': user_id, 'telegram_id': 100000 + user_id, 'username': f'user{user_id}',
+         'interface_language_id': 1 + user_id % 2, 'agreed_to_terms_of_service': True, 'is_confirmed': True,
+         'trial_ends_at': now + timedelta(hours=user_id - 10), 'subscription_ends_at': now + timedelta(days=user_id - 10),
+         'payment_confirmed': user_id % 3 == 0}
+        for user_id in range(1, users + 1)
+    ])
+    await session.execute(insert(user_learning_languages), [
+        {'user_id': user_id, 'language_id': 3, 'is_active': True} for user_id in range(1, users + 1)
+    ])
+
+    # every lexeme is shared by about four users
+    lexemes = max(rows_per_user, users * rows_per_user // 4)
+    await session.execute(insert(Lexeme), [
+        {'id': lexeme_id, 'language_id': 3, 'normalized': f'word{lexeme_id}', 'text': f'Word{lexeme_id}'}
+        for lexeme_id in range(1, lexemes + 1)
+    ])
+
+    for user_id in range(1, users + 1):
+        await session.execute(insert(UserWord), [
+            {'user_id': user_id, 'lexeme_id': (user_id * 7 + index) % lexemes + 1,
+             'created_at': now - timedelta(minutes=index)}
+            for index in range(rows_per_user)
+        ])
+        await session.execute(insert(Token), [
+            {'user_id': user_id, 'token_count': 100, 'cost': 0.01, 'created_at': now - timedelta(hours=index)}
+            for index in range(rows_per_user)
+        ])
+        await session.execute(insert(Payment), [
+            {'user_id': user_id, 'provider': 'test', 'payment_id': f'{user_id}-{index}', 'amount': 100.0,
+             'subscription_type': 'monthly', 'status': 'completed'}
+            for index in range(rows_per_user)
+        ])
+
+    await session.execute(insert(PromoCode), [
+        {'code': f'PROMO{index}', 'discount_percent': 10, 'discount_amount': 0.0, 'uses_limit': 100,
+         'uses_count': 0, 'valid_from': now - timedelta(days=1), 'valid_until': now + timedelta(days=index),
+         'is_active': True}
+        for index in range(1, 21)
+    ])
+
+    await session.commit()
+    await session.execute(text("ANALYZE"))
+
+    return {'user_id': users // 2, 'telegram_id': 100000 + users // 2, 'erased_user_id': users,
+            'promo_code': 'PROMO1'}
+
+
+# ========== AUDITED QUERIES ==========
+
+async def run_service_queries(session: AsyncSession, user_id: int, telegram_id: int) -> None:
+    """
+    Run the read queries of the services against the seeded database
+    """
+    from developer.services import (UserService, UserAgreementService, PrivacyPolicyService, LanguageService,
+                                    WordService, TokenService, LanguageCatalog, ExportService)
+
+    user_service = UserService(session)
+    await user_service.get_user_by_telegram_id(telegram_id)
+    await user_service.get_user_language(telegram_id)
+    await user_service.get_user_registration_status(telegram_id)
+    await user_service.get_user_admin_status(telegram_id)
+
+    # the resolvers are called directly, the public methods may be answered from the cache
+    user_agreement_service = UserAgreementService(session)
+    await user_agreement_service._resolve_active_agreement('de')
+    await user_agreement_service.get_active_agreement_by_language_id(2)
+    await user_agreement_service.get_all_active_agreements()
+    await user_agreement_service.get_latest_agreement_for_language('ru')
+    await user_agreement_service.check_agreement_exists_for_language('ru', '1.1')
+    await PrivacyPolicyService(session)._resolve_active_policy('de')
+
+    language_service = LanguageService(session)
+    await language_service.get_language_by_code('ru')
+    await language_service.get_interface_languages()
+    await LanguageCatalog.load(session)
+
+    word_service = WordService(session)
+    await word_service.get_user_words(user_id)
+    page = await word_service.get_words_page(user_id, limit=5)
+    if page.older_cursor is not None:
+        older = await word_service.get_words_page(user_id, page.older_cursor, limit=5)
+        await word_service.get_words_page(user_id, older.newer_cursor, newer=True, limit=5)
+
+    await word_service.search(user_id, 'word1')
+    await word_service.search(user_id, 'word1 word2', mode='any', language_id=3)
+
+    token_service = TokenService(session)
+    await token_service.get_daily_usage(user_id)
+    await token_service.get_usage_for_last_days(user_id, 30)
+    await token_service.get_usage_history(user_id)
+
+    with tempfile.TemporaryDirectory() as directory:
+        export_service = ExportService(session, chunk_size=100)
+        await export_service.export_words(os.path.join(directory, 'words.csv'), user_id)
+        await export_service.export_words(os.path.join(directory, 'words.json'), user_id, export_format='json')
+        await export_service.export_learning_history(os.path.join(directory, 'history.csv'), user_id)
+
+    # relationship loads
+    await session.execute(
+        select(User)
+        .options(
+            selectinload(User.words),
+            selectinload(User.tokens),
+            selectinload(User.payments),
+            selectinload(User.learning_languages),
+        )
+        .where(User.id == user_id)
+    )
+
+
+async def run_background_queries(session_factory: Callable[[], Any], user_id: int, erased_user_id: int,
+                                 promo_code: str) -> None:
+    """
+    Run the queries of the services and jobs opening their own sessions, the writes included,
+    against the seeded database
+
+    :param session_factory: factory of the sessions of the seeded database
+    :param user_id: ID of the user the words are imported for
+    :param erased_user_id: ID of the user erased at the end
+    :param promo_code: the redeemed promo code
+    """
+    from developer.services import WordImportService, AccountErasureService, PromoCodeService, active_promo_codes
+    from developer.scheduler import ExpiryJob
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'words.csv')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write("\n".join(f"word{index}" for index in range(50)))
+
+        await WordImportService(session_factory, batch_size=20).import_file(path, user_id, 3)
+
+    # the snapshot of the active codes belongs to the audited database, it is dropped around the redemption
+    active_promo_codes.invalidate()
+    try:
+        await PromoCodeService(session_factory, session_factory).redeem(promo_code)
+
+    finally:
+        active_promo_codes.invalidate()
+
+    await ExpiryJob(session_factory, chunk_size=5).run()
+
+    await AccountErasureService(session_factory, chunk_size=5).erase(erased_user_id)
+
+
+async def run_query_audit(users: int = 1000, rows_per_user: int = 20,
+                          database_path: Optional[str] = None) -> List[QueryPlan]:
+    """
+    Create a seeded database from the models, run the service queries on it and explain them
+
+    :param users: number of seeded users
+    :param rows_per_user: number of seeded words, token usages and payments of every user
+    :param database_path: path of the database file, a temporary one by default
+    :return: plans of all executed queries
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{database_path or os.path.join(directory, 'audit.db')}")
+
+        try:
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+
+            session_maker = async_sessionmaker(engine, expire_on_commit=False)
+            async with session_maker() as session:
+                seeded = await seed_database(session, users, rows_per_user)
+
+            auditor = QueryAuditor(engine)
+            async with auditor.capture():
+                async with session_maker() as session:
+                    await run_service_queries(session, seeded['user_id'], seeded['telegram_id'])
+
+                await run_background_queries(session_maker, seeded['user_id'], seeded['erased_user_id'],
+                                             seeded['promo_code'])
+
+            return await auditor.explain()
+
+        finally:
+            await engine.dispose()
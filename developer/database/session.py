@@ -1,10 +1,18 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy import column, delete, event, insert, literal, select, table
+from sqlalchemy.engine import Row, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncConnection, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Dict, Optional
+import asyncio
+import hashlib
 import logging
+import os
 
-from config import get_config
+from config import get_config, BASE_DIR
+from .instrumentation import statement_cache_stats, query_instrumentation
 
 logger = logging.getLogger(__name__)
 Config = get_config()
@@ -12,11 +20,70 @@ Config = get_config()
 # create Base for models
 Base = declarative_base()
 
+# the revision table maintained by alembic, read together with the schema fingerprint
+ALEMBIC_VERSION = table('alembic_version', column('version_num'))
+
 class DatabaseManager:
     def __init__(self):
         self.engine = None
+        self.read_engine = None
         self.async_session_maker = None
+        self.read_session_maker = None
+        self._write_lock = asyncio.Lock()
+        self._write_lock_owner: Optional[asyncio.Task] = None
         self._initialized = False
+        self._checkpoint_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _is_sqlite(database_uri: str) -> bool:
+        return make_url(database_uri).get_backend_name() == 'sqlite'
+
+    @staticmethod
+    def _is_sqlite_file(database_uri: str) -> bool:
+        url = make_url(database_uri)
+        return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+    @staticmethod
+    def _get_read_only_uri(database_uri: str) -> str:
+        # opening the same file through an sqlite URI in read-only mode
+        url = make_url(database_uri)
+        read_only_url = url.set(database=f'file:{url.database}', query={**url.query, 'mode': 'ro', 'uri': 'true'})
+        return read_only_url.render_as_string(hide_password=False)
+
+    @staticmethod
+    def _get_engine_options(database_uri: str) -> Dict[str, Any]:
+        options = {
+            'echo': Config.DEBUG,
+            'future': True,
+        }
+
+        # a local sqlite file has no server connections to check or recycle
+        if not DatabaseManager._is_sqlite(database_uri):
+            options.update(pool_pre_ping=True, pool_recycle=3600)
+
+        return options
+
+    @staticmethod
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in Config.SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _apply_sqlite_reader_pragmas(dbapi_connection, connection_record) -> None:
+        # the journal mode is a property of the database file, set by the writer
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in Config.SQLITE_PRAGMAS.items():
+                if pragma != 'journal_mode':
+                    cursor.execute(f"PRAGMA {pragma}={value}")
+
+        finally:
+            cursor.close()
 
     async def initialize(self):
         if self._initialized:
@@ -24,14 +91,42 @@ class DatabaseManager:
             return
 
         try:
-            # create db engine
-            self.engine = create_async_engine(
-                Config.DATABASE_URI,
-                echo=Config.DEBUG,
-                future=True,
-                pool_pre_ping=True,
-                pool_recycle=3600
-            )
+            engine_options = self._get_engine_options(Config.DATABASE_URI)
+
+            if self._is_sqlite_file(Config.DATABASE_URI):
+                # a single dedicated writer connection, writers queue up on the write lock
+                self.engine = create_async_engine(
+                    Config.DATABASE_URI,
+                    pool_size=1,
+                    max_overflow=0,
+                    **engine_options
+                )
+
+                # a pool of read-only connections reading concurrently thanks to WAL
+                self.read_engine = create_async_engine(
+                    self._get_read_only_uri(Config.DATABASE_URI),
+                    pool_size=Config.DATABASE_READ_POOL_SIZE,
+                    max_overflow=0,
+                    **engine_options
+                )
+
+                # applying the sqlite tuning profile on every new connection
+                event.listen(self.engine.sync_engine, 'connect', self._apply_sqlite_pragmas)
+                event.listen(self.read_engine.sync_engine, 'connect', self._apply_sqlite_reader_pragmas)
+                self._start_wal_checkpoints()
+
+            else:
+                # create db engine
+                self.engine = create_async_engine(Config.DATABASE_URI, **engine_options)
+                self.read_engine = self.engine
+
+                if self._is_sqlite(Config.DATABASE_URI):
+                    event.listen(self.engine.sync_engine, 'connect', self._apply_sqlite_pragmas)
+
+            # counting the executions served from the compiled SQL cache and the statements of every update
+            for engine in {self.engine, self.read_engine}:
+                statement_cache_stats.attach(engine)
+                query_instrumentation.attach(engine)
 
             # create async session maker
             self.async_session_maker = async_sessionmaker(
@@ -42,6 +137,15 @@ class DatabaseManager:
                 autocommit=False
             )
 
+            # create async session maker for the read path
+            self.read_session_maker = async_sessionmaker(
+                bind=self.read_engine,
+                class_=AsyncSession,
+                expire_on_commit=False,
+                autoflush=False,
+                autocommit=False
+            )
+
             self._initialized = True
             logger.info("Database initialized successfully")
 
@@ -55,7 +159,7 @@ class DatabaseManager:
 
         try:
             from developer.database.models import Base
-            async with self.engine.begin() as conn:
+            async with self.get_write_connection() as conn, conn.begin():
                 await conn.run_sync(Base.metadata.create_all)
             logger.info("Tables created successfully")
 
@@ -69,7 +173,7 @@ class DatabaseManager:
 
         try:
             from developer.database.models import Base
-            async with self.engine.begin() as conn:
+            async with self.get_write_connection() as conn, conn.begin():
                 await conn.run_sync(Base.metadata.drop_all)
             logger.info("Tables dropped successfully")
 
@@ -77,30 +181,208 @@ class DatabaseManager:
             logger.error(f'Failed to drop database tables: {e}')
             raise
 
+    @asynccontextmanager
+    async def _hold_write_lock(self) -> AsyncGenerator[None, None]:
+        # the lock is not re-entrant, a nested acquisition would wait for itself forever
+        task = asyncio.current_task()
+        if task is not None and self._write_lock_owner is task:
+            raise RuntimeError("The write lock is already held by this task, write sessions can't be nested")
+
+        async with self._write_lock:
+            self._write_lock_owner = task
+            try:
+                yield
+
+            finally:
+                self._write_lock_owner = None
+
     @asynccontextmanager
     async def get_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Session on the write path, sessions are handed out one at a time in the
+        order they were requested.
+
+        The write lock is held until the session is closed and is not re-entrant: a task
+        must not open another write session, or a write connection, while it holds one,
+        and must not wait for the write batcher either, whose worker needs the lock too.
+        Opening a nested write session raises RuntimeError instead of deadlocking.
+        """
         if not self._initialized:
             await self.initialize()
 
-        async with self.async_session_maker() as session:
+        async with self._hold_write_lock():
+            async with self.async_session_maker() as session:
+                try:
+                    yield session
+
+                except Exception as e:
+                    await session.rollback()
+                    logger.error(f"Error while processing a database request: {e}")
+                    raise
+
+                finally:
+                    await session.close()
+
+    get_write_session = get_session
+
+    @asynccontextmanager
+    async def get_write_connection(self) -> AsyncGenerator[AsyncConnection, None]:
+        """
+        Connection of the writer for the statements outside of the ORM, e.g. DDL and
+        pragmas, taken under the same write lock as the write sessions
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        async with self._hold_write_lock():
+            async with self.engine.connect() as connection:
+                yield connection
+
+    @asynccontextmanager
+    async def get_read_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """
+        Session on the read path, served concurrently from the pool of readers
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        async with self.read_session_maker() as session:
             try:
                 yield session
 
             except Exception as e:
                 await session.rollback()
-                logger.error(f"Error while processing a database request: {e}")
+                logger.error(f"Error while processing a database read request: {e}")
                 raise
 
             finally:
                 await session.close()
 
+    def _start_wal_checkpoints(self) -> None:
+        if not Config.SQLITE_WAL_CHECKPOINT_INTERVAL:
+            return
+
+        try:
+            self._checkpoint_task = asyncio.get_running_loop().create_task(
+                self._run_wal_checkpoints(Config.SQLITE_WAL_CHECKPOINT_INTERVAL)
+            )
+
+        except RuntimeError:
+            logger.warning("No running event loop, periodic WAL checkpoints disabled")
+
+    async def _run_wal_checkpoints(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+
+            try:
+                async with self.get_write_connection() as connection:
+                    result = await connection.exec_driver_sql(
+                        f"PRAGMA wal_checkpoint({Config.SQLITE_WAL_CHECKPOINT_MODE})"
+                    )
+                    busy, log_frames, checkpointed_frames = result.first()
+
+                logger.debug(f"WAL checkpoint done: busy={busy}, log frames={log_frames}, "
+                             f"checkpointed frames={checkpointed_frames}")
+
+            except Exception as e:
+                logger.error(f"Error running WAL checkpoint: {e}")
+
     async def close(self):
+        if self._initialized:
+            logger.info(f"Statement cache: {statement_cache_stats.summary()}")
+            logger.info(f"Executed {query_instrumentation.queries} statements, "
+                        f"{query_instrumentation.slow_queries} slow")
+            for label, totals in sorted(query_instrumentation.totals.items(), key=lambda item: -item[1].queries):
+                logger.info(f"{label}: {totals.queries} statements in {totals.scopes} runs, "
+                            f"{totals.duration * 1000:.1f} ms")
+
+        if self._checkpoint_task:
+            self._checkpoint_task.cancel()
+            self._checkpoint_task = None
+
+        if self.read_engine and self.read_engine is not self.engine:
+            await self.read_engine.dispose()
+
         if self.engine:
             await self.engine.dispose()
             logger.info("Database connection closed")
 
         self._initialized = False
 
+    def compute_schema_fingerprint(self) -> str:
+        """
+        Hash of the DDL of every model and of the list of migration scripts
+        """
+        from developer.database.models import Base
+
+        digest = hashlib.sha256()
+        dialect = self.engine.dialect
+
+        for table_name in sorted(Base.metadata.tables):
+            table = Base.metadata.tables[table_name]
+            digest.update(str(CreateTable(table).compile(dialect=dialect)).encode('utf-8'))
+
+            for index in sorted(table.indexes, key=lambda table_index: table_index.name or ''):
+                digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode('utf-8'))
+
+        versions_dir = os.path.join(BASE_DIR, 'alembic', 'versions')
+        if os.path.isdir(versions_dir):
+            for script_name in sorted(os.listdir(versions_dir)):
+                if script_name.endswith('.py'):
+                    digest.update(script_name.encode('utf-8'))
+
+        return digest.hexdigest()
+
+    async def get_stored_schema_state(self) -> Optional[Row]:
+        """
+        Receive the stored fingerprint, the head revision it was stored at and the current
+        revision of the database with one query
+
+        :return: row of fingerprint, head_revision and current_revision, or None if the
+            fingerprint or the alembic_version table does not exist yet
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        from developer.database.models import SchemaFingerprint
+
+        try:
+            async with self.get_write_connection() as connection:
+                result = await connection.execute(
+                    select(
+                        SchemaFingerprint.fingerprint,
+                        SchemaFingerprint.head_revision,
+                        select(ALEMBIC_VERSION.c.version_num).limit(1).scalar_subquery().label('current_revision')
+                    ).limit(1)
+                )
+                return result.first()
+
+        except DBAPIError as e:
+            # there is no fingerprint or alembic_version table yet
+            logger.debug(f"Schema fingerprint not available: {e}")
+            return None
+
+    async def store_schema_fingerprint(self, fingerprint: str) -> None:
+        """
+        Store the fingerprint together with the current revision of the database, called
+        once the revision was checked to be the head of the migrations
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        from developer.database.models import SchemaFingerprint
+
+        async with self.get_write_connection() as connection, connection.begin():
+            await connection.execute(delete(SchemaFingerprint))
+            await connection.execute(
+                insert(SchemaFingerprint).from_select(
+                    ['id', 'fingerprint', 'head_revision'],
+                    select(literal(1), literal(fingerprint), ALEMBIC_VERSION.c.version_num).limit(1)
+                )
+            )
+
+        logger.info(f"Schema fingerprint stored: {fingerprint}")
+
     async def check_migration_status(self):
         if not self._initialized:
             await self.initialize()
@@ -121,7 +403,7 @@ class DatabaseManager:
                 current_revision = context.get_current_revision()
                 return current_revision
 
-            async with self.engine.connect() as connection:
+            async with self.get_write_connection() as connection:
                 current_revision = await connection.run_sync(get_migration_info)
                 head_revision = script.get_current_head()
 
@@ -143,20 +425,42 @@ async def initialize_database():
     logger.info("Initializing database")
     await db_manager.initialize()
 
-    # check migration status
-    logger.info("Checking migration status")
-    migrations_ok = await db_manager.check_migration_status()
-    if not migrations_ok:
-        if Config.__class__.__name__ == 'ProductionConfig':
-            raise RuntimeError("Database is not up to date. Please run 'alembic upgrade head' to upgrade the database.")
-        else:
-            logger.warning("Database is not up to date. Please run 'alembic upgrade head' to upgrade the database.")
-
-    # create tables
-    logger.info("Creating tables")
-    await db_manager.create_tables()
+    # the fingerprint covers the migration scripts, so while it matches the head revision
+    # stored with it is still the head, and the revision of the database is compared with
+    # it in the same query, a database downgraded or replaced by an older copy is caught
+    fingerprint = db_manager.compute_schema_fingerprint()
+    stored_state = await db_manager.get_stored_schema_state()
+    if (stored_state is not None and stored_state.fingerprint == fingerprint
+            and stored_state.head_revision is not None
+            and stored_state.current_revision == stored_state.head_revision):
+        logger.info("Schema fingerprint and revision unchanged, skipping migration check and tables creation")
+
+    else:
+        # loading the migration scripts only when the schema or the revision changed
+        logger.info("Checking migration status")
+        migrations_ok = await db_manager.check_migration_status()
+        if not migrations_ok:
+            if Config.__class__.__name__ == 'ProductionConfig':
+                raise RuntimeError("Database is not up to date. Please run 'alembic upgrade head' to upgrade the database.")
+            else:
+                logger.warning("Database is not up to date. Please run 'alembic upgrade head' to upgrade the database.")
+
+        # create tables
+        logger.info("Creating tables")
+        await db_manager.create_tables()
+
+        # the tables creation is repeated on the next start until the database is up to date
+        if migrations_ok:
+            await db_manager.store_schema_fingerprint(fingerprint)
+
+    # start group commit of batched writes
+    from .batching import write_batcher
+    write_batcher.start()
 
 async def close_database():
+    from .batching import write_batcher
+    await write_batcher.stop()
+
     await db_manager.close()
 
 async def reset_database():
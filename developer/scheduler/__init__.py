@@ -0,0 +1,4 @@
+from .scheduler import Scheduler, job_scheduler
+from .expiry_job import ExpiryJob, expiry_job_runner
+
+__all__ = ["Scheduler", "job_scheduler", "ExpiryJob", "expiry_job_runner"]
@@ -0,0 +1,154 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, insert, and_, or_, not_, tuple_
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Sequence, Tuple
+from developer.database.models import User, Language, JobWatermark
+from developer.database.session import db_manager
+from developer.localization import i18n
+from developer.telegram.common.outbound import outbound_sender
+from config import get_config
+import logging
+
+Config = get_config()
+
+logger = logging.getLogger(__name__)
+
+# (ends_at, id) of the last processed user
+ExpiryCursor = Tuple[datetime, int]
+
+
+class ExpiryJob:
+    """
+    Expires the trials and the subscriptions which ended since the previous run.
+
+    Every kind of expiry keeps a watermark, the (ends_at, id) of the last processed user,
+    and scans only the users after it up to now, chunk by chunk over the index of its
+    ``*_ends_at`` column. So a run costs the number of users expired since the previous
+    run, not the number of users. The state changes of a chunk are applied with one bulk
+    UPDATE, committed together with the advanced watermark, and the notifications are
+    queued to the outbound sender after the commit.
+
+    A user whose end date is set into the past, behind the watermark, is not processed.
+    """
+    def __init__(
+            self,
+            session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]] = None,
+            chunk_size: int = 500,
+            catch_up: float = 24 * 60 * 60
+    ) -> None:
+        self.session_factory = session_factory or db_manager.get_write_session
+        self.chunk_size = chunk_size
+        self.catch_up = timedelta(seconds=catch_up)
+
+    # ========== WATERMARKS ==========
+
+    async def _get_watermark(self, name: str, now: datetime) -> ExpiryCursor:
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(JobWatermark.processed_until, JobWatermark.last_id).where(JobWatermark.name == name)
+            )
+            watermark = result.first()
+            if watermark is not None:
+                return watermark.processed_until, watermark.last_id
+
+            # the first run, only the recent expiries are processed
+            processed_until = now - self.catch_up
+            await session.execute(insert(JobWatermark).values(name=name, processed_until=processed_until, last_id=0))
+            await session.commit()
+
+        return processed_until, 0
+
+    # ========== PROCESSING ==========
+
+    async def _process(self, name: str, ends_at, now: datetime, expiring: Sequence, values: Dict[str, Any],
+                       message_key: str) -> int:
+        """
+        Process the users whose ``ends_at`` passed since the watermark of the job
+
+        :param name: name of the watermark
+        :param ends_at: the indexed end date column
+        :param now: the upper bound of the processed end dates
+        :param expiring: conditions of the users actually expiring, the others are only skipped
+        :param values: state changes of the expiring users, nothing is updated if empty
+        :param message_key: localization key of the notification
+        :return: number of the expired users
+        """
+        cursor = await self._get_watermark(name, now)
+        expired = 0
+
+        while True:
+            async with self.session_factory() as session:
+                result = await session.execute(
+                    select(ends_at.label('ends_at'), User.id, User.telegram_id, Language.code,
+                           and_(*expiring).label('is_expiring'))
+                    .join(Language, Language.id == User.interface_language_id)
+                    .where(tuple_(ends_at, User.id) > tuple_(*cursor), ends_at <= now)
+                    .order_by(ends_at, User.id)
+                    .limit(self.chunk_size)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+
+                users = [row for row in rows if row.is_expiring]
+                if users and values:
+                    await session.execute(
+                        update(User)
+                        .where(User.id.in_([user.id for user in users]))
+                        .values(**values)
+                        .execution_options(synchronize_session=False)
+                    )
+
+                cursor = (rows[-1].ends_at, rows[-1].id)
+                await session.execute(
+                    update(JobWatermark)
+                    .where(JobWatermark.name == name)
+                    .values(processed_until=cursor[0], last_id=cursor[1])
+                )
+                await session.commit()
+
+            for user in users:
+                outbound_sender.send(user.telegram_id, i18n.get_text(message_key, user.code))
+
+            expired += len(users)
+            if len(rows) < self.chunk_size:
+                break
+
+        return expired
+
+    async def expire_trials(self, now: datetime) -> int:
+        # the trial has no state of its own, the users without a paid subscription are notified
+        return await self._process(
+            "trial_expiry",
+            User.trial_ends_at,
+            now,
+            expiring=(
+                not_(User.is_always_free_of_charge),
+                or_(User.subscription_ends_at.is_(None), User.subscription_ends_at <= now),
+            ),
+            values={},
+            message_key="messages.subscription.trial_expired"
+        )
+
+    async def expire_subscriptions(self, now: datetime) -> int:
+        return await self._process(
+            "subscription_expiry",
+            User.subscription_ends_at,
+            now,
+            expiring=(not_(User.is_always_free_of_charge), User.payment_confirmed),
+            values={'payment_confirmed': False},
+            message_key="messages.subscription.expired"
+        )
+
+    async def run(self) -> None:
+        now = datetime.now()
+        trials = await self.expire_trials(now)
+        subscriptions = await self.expire_subscriptions(now)
+
+        if trials or subscriptions:
+            logger.info(f"Expired {trials} trials and {subscriptions} subscriptions")
+
+
+# creating global expiry job runner
+expiry_job_runner = ExpiryJob(chunk_size=Config.EXPIRY_CHUNK_SIZE, catch_up=Config.EXPIRY_CATCH_UP)
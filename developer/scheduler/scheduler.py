@@ -0,0 +1,57 @@
+from typing import Awaitable, Callable, List, Tuple
+from developer.database.instrumentation import query_instrumentation
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """
+    Runs the registered jobs periodically, every job in its own background task.
+    A failed run is logged and the job runs again after its interval.
+    """
+    def __init__(self) -> None:
+        self._jobs: List[Tuple[str, Callable[[], Awaitable[None]], float]] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, job: Callable[[], Awaitable[None]], interval: float) -> None:
+        """
+        Register a job, the jobs added after the start are run on the next start
+
+        :param name: name of the job
+        :param job: coroutine function running the job once
+        :param interval: seconds between the end of a run and the start of the next one
+        """
+        self._jobs.append((name, job, interval))
+
+    async def _run_job(self, name: str, job: Callable[[], Awaitable[None]], interval: float) -> None:
+        while True:
+            try:
+                with query_instrumentation.scope(f"job {name}"):
+                    await job()
+
+            except Exception as e:
+                logger.error(f"Error running job '{name}': {e}")
+
+            await asyncio.sleep(interval)
+
+    def start(self) -> None:
+        if self._tasks:
+            logger.warning("Scheduler already started")
+            return
+
+        self._tasks = [asyncio.create_task(self._run_job(*job)) for job in self._jobs]
+        logger.info(f"Scheduler started with {len(self._tasks)} jobs")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Scheduler stopped")
+
+
+# creating global job scheduler
+job_scheduler = Scheduler()
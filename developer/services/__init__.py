@@ -2,5 +2,16 @@ from .user_service import UserService
 from .user_agreement_service import UserAgreementService
 from .language_service import LanguageService
 from .privacy_policy_service import PrivacyPolicyService
+from .word_service import WordService
+from .token_service import TokenService
+from .word_import_service import WordImportService
+from .export_service import ExportService
+from .account_erasure_service import AccountErasureService, account_eraser
+from .language_catalog import LanguageCatalog, language_catalog_manager
+from .promo_code_service import PromoCodeService, active_promo_codes
 
-__all__ = ["UserService", "UserAgreementService", "LanguageService", "PrivacyPolicyService"]
+__all__ = [
+    "UserService", "UserAgreementService", "LanguageService", "PrivacyPolicyService", "WordService", "TokenService",
+    "WordImportService", "ExportService", "AccountErasureService", "account_eraser", "LanguageCatalog",
+    "language_catalog_manager", "PromoCodeService", "active_promo_codes",
+]
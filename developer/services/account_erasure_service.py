@@ -0,0 +1,178 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, update
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime
+from typing import Awaitable, Callable, Optional, Tuple
+from developer.database.models import User, Token, UserWord, Payment
+from developer.database.session import db_manager
+from developer.services.word_index import word_index
+from config import get_config
+import asyncio
+import logging
+
+Config = get_config()
+
+logger = logging.getLogger(__name__)
+
+
+class AccountErasureService:
+    """
+    Erases user accounts with chunked bulk deletes.
+
+    The tables with many rows per user are emptied first in chunks of ``chunk_size`` rows,
+    every chunk in its own short write transaction, so other writers are not locked out
+    while a heavy account is erased. The user row is deleted last, the rest (daily token
+    rollups, learning languages) goes with it by ON DELETE CASCADE and the references of
+    the agreements and privacy policies administered by the user are set to NULL.
+    """
+    # tables emptied chunk by chunk, the largest first
+    CHUNKED_TABLES = (Token, UserWord, Payment)
+
+    def __init__(
+            self,
+            session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]] = None,
+            chunk_size: int = 2000
+    ) -> None:
+        self.session_factory = session_factory or db_manager.get_write_session
+        self.chunk_size = chunk_size
+
+    async def _delete_chunk(self, model, user_id: int) -> int:
+        async with self.session_factory() as session:
+            result = await session.execute(
+                delete(model).where(
+                    model.id.in_(select(model.id).where(model.user_id == user_id).limit(self.chunk_size))
+                )
+            )
+            await session.commit()
+
+        return result.rowcount
+
+    async def erase(self, user_id: int) -> int:
+        """
+        Erase the user with all the user's data
+
+        :param user_id: ID of the user
+        :return: number of deleted rows of the chunked tables
+        """
+        deleted = 0
+
+        for model in self.CHUNKED_TABLES:
+            while True:
+                rowcount = await self._delete_chunk(model, user_id)
+                deleted += rowcount
+
+                if rowcount < self.chunk_size:
+                    break
+
+        async with self.session_factory() as session:
+            await session.execute(delete(User).where(User.id == user_id))
+            await session.commit()
+
+        word_index.invalidate(user_id)
+        logger.info(f"Erased user {user_id} with {deleted} rows")
+        return deleted
+
+
+class AccountEraser:
+    """
+    Background job erasing the scheduled accounts one at a time, so handlers only
+    enqueue the erasure and answer right away.
+
+    A scheduled erasure is recorded in ``users.erasure_requested_at``, the record goes
+    with the user row, so the erasures interrupted by a restart are resumed on start.
+    """
+    def __init__(self, chunk_size: int = 2000) -> None:
+        self.service = AccountErasureService(chunk_size=chunk_size)
+        self._queue: asyncio.Queue[Tuple[int, Optional[Callable[[], Awaitable[None]]]]] = asyncio.Queue()
+        self._scheduled = set()
+        self._worker_task: Optional[asyncio.Task] = None
+
+    def is_scheduled(self, user_id: int) -> bool:
+        return user_id in self._scheduled
+
+    async def schedule(self, user_id: int, on_erased: Optional[Callable[[], Awaitable[None]]] = None) -> bool:
+        """
+        Schedule the erasure of a user, the request is committed before it is queued
+
+        :param user_id: ID of the user
+        :param on_erased: coroutine function called once the user is erased
+        :return: False if the user is already scheduled
+        """
+        if user_id in self._scheduled:
+            return False
+
+        self._scheduled.add(user_id)
+        try:
+            async with self.service.session_factory() as session:
+                await session.execute(
+                    update(User)
+                    .where(User.id == user_id, User.erasure_requested_at.is_(None))
+                    .values(erasure_requested_at=datetime.now())
+                )
+                await session.commit()
+
+        except Exception:
+            self._scheduled.discard(user_id)
+            raise
+
+        self._queue.put_nowait((user_id, on_erased))
+        logger.info(f"Erasure of user {user_id} scheduled")
+        return True
+
+    async def _run_worker(self) -> None:
+        while True:
+            user_id, on_erased = await self._queue.get()
+
+            try:
+                await self.service.erase(user_id)
+
+                if on_erased is not None:
+                    await on_erased()
+
+            except Exception as e:
+                logger.error(f"Error erasing user {user_id}: {e}")
+
+            finally:
+                self._scheduled.discard(user_id)
+                self._queue.task_done()
+
+    async def start(self) -> None:
+        if self._worker_task is not None:
+            logger.warning("Account eraser already started")
+            return
+
+        # resuming the erasures requested before the restart, without notifications
+        async with db_manager.get_read_session() as session:
+            result = await session.execute(
+                select(User.id)
+                .where(User.erasure_requested_at.is_not(None))
+                .order_by(User.erasure_requested_at)
+            )
+            user_ids = result.scalars().all()
+
+        for user_id in user_ids:
+            if user_id not in self._scheduled:
+                self._scheduled.add(user_id)
+                self._queue.put_nowait((user_id, None))
+
+        self._worker_task = asyncio.create_task(self._run_worker())
+        logger.info(f"Account eraser started, {len(user_ids)} erasures resumed")
+
+    async def stop(self) -> None:
+        if self._worker_task is None:
+            return
+
+        # the erasures still queued are resumed on the next start
+        self._worker_task.cancel()
+        try:
+            await self._worker_task
+
+        except asyncio.CancelledError:
+            pass
+
+        self._worker_task = None
+        logger.info("Account eraser stopped")
+
+
+# creating global account eraser
+account_eraser = AccountEraser(chunk_size=Config.ACCOUNT_ERASURE_CHUNK_SIZE)
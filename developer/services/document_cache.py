@@ -0,0 +1,114 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event, select, update, insert
+from sqlalchemy.orm import Session
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Optional
+from developer.database.models import CacheVersion
+from config import get_config
+import logging
+
+Config = get_config()
+
+logger = logging.getLogger(__name__)
+
+# session info key of the caches to clear once the session is committed
+INVALIDATED_CACHES_KEY = 'invalidated_document_caches'
+
+
+class ActiveDocumentCache:
+    """
+    Locale-keyed cache of resolved active documents (user agreements, privacy policies).
+
+    The cache is invalidated by the service methods changing the active documents,
+    which also bump a version counter in the ``cache_versions`` table within the
+    same transaction. The local cache is cleared once that transaction is committed,
+    so a concurrent lookup can't cache the documents read before the change. Other
+    worker processes compare the counter with their own at most every
+    ``check_interval`` seconds and drop their cache when it changed.
+    """
+    def __init__(self, name: str, check_interval: float = 5.0) -> None:
+        self.name = name
+        self.check_interval = check_interval
+
+        self._documents: Dict[str, Optional[Any]] = {}
+        self._version: Optional[int] = None
+        self._checked_at: Optional[float] = None
+
+    async def _sync_version(self, session: AsyncSession) -> None:
+        now = monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+
+        result = await session.execute(select(CacheVersion.version).where(CacheVersion.name == self.name))
+        version = result.scalar() or 0
+        self._checked_at = now
+
+        if version != self._version:
+            if self._version is not None:
+                logger.info(f"Cache '{self.name}' version changed from {self._version} to {version}, clearing it")
+
+            self._documents.clear()
+            self._version = version
+
+    async def get(self, session: AsyncSession, locale_code: str,
+                  resolve: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """
+        Receive the active document for the locale, resolving it on a cache miss
+
+        :param session: session used to check the version counter
+        :param locale_code: locale code the document is resolved for
+        :param resolve: coroutine function resolving the document from the database
+        :return: the active document or None
+        """
+        await self._sync_version(session)
+
+        if locale_code in self._documents:
+            return self._documents[locale_code]
+
+        version = self._version
+        document = await resolve()
+
+        # the document is not cached if the cache was invalidated while resolving it
+        if version == self._version:
+            self._documents[locale_code] = document
+
+        return document
+
+    def clear(self) -> None:
+        self._documents.clear()
+        self._version = None
+        self._checked_at = None
+        logger.debug(f"Cache '{self.name}' invalidated")
+
+    async def invalidate(self, session: AsyncSession) -> None:
+        """
+        Bump the version counter and clear the cache once the session is committed,
+        the caller commits the session
+        """
+        result = await session.execute(
+            update(CacheVersion)
+            .where(CacheVersion.name == self.name)
+            .values(version=CacheVersion.version + 1)
+        )
+
+        # the rows are seeded by the migrations, a database created from the models has none
+        if result.rowcount == 0:
+            await session.execute(insert(CacheVersion).values(name=self.name, version=1))
+
+        session.info.setdefault(INVALIDATED_CACHES_KEY, set()).add(self)
+
+
+@event.listens_for(Session, 'after_commit')
+def _clear_invalidated_caches(session: Session) -> None:
+    for cache in session.info.pop(INVALIDATED_CACHES_KEY, ()):
+        cache.clear()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_invalidated_caches(session: Session) -> None:
+    session.info.pop(INVALIDATED_CACHES_KEY, None)
+
+
+# creating global caches
+user_agreement_cache = ActiveDocumentCache('user_agreements', Config.DOCUMENT_CACHE_CHECK_INTERVAL)
+privacy_policy_cache = ActiveDocumentCache('privacy_policies', Config.DOCUMENT_CACHE_CHECK_INTERVAL)
@@ -0,0 +1,149 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from datetime import date, datetime
+from typing import Any, IO, List, Optional, Sequence
+from developer.database.models import Language, Lexeme, UserWord, user_learning_languages
+import asyncio
+import csv
+import io
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ExportService:
+    """
+    Exports the vocabulary and the learning history into CSV or JSON files.
+
+    Rows are streamed from the database in partitions of ``chunk_size`` and every partition
+    is serialized and written in a worker thread, so neither the memory nor the event loop
+    blocking depend on the number of exported rows.
+    """
+    FORMATS = ('csv', 'json')
+
+    def __init__(self, session: AsyncSession, chunk_size: int = 1000) -> None:
+        self.session = session
+        self.chunk_size = chunk_size
+
+    # ========== SERIALIZATION ==========
+
+    @staticmethod
+    def _to_json_value(value: Any) -> Any:
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+
+        return value
+
+    @classmethod
+    def _serialize(cls, rows: Sequence[Sequence[Any]], columns: Sequence[str], export_format: str,
+                   first: bool) -> str:
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if first:
+                writer.writerow(columns)
+
+            writer.writerows(rows)
+            return buffer.getvalue()
+
+        # a JSON array written item by item, every item on its own line
+        items = ",\n".join(
+            json.dumps({column: cls._to_json_value(value) for column, value in zip(columns, row)}, ensure_ascii=False)
+            for row in rows
+        )
+        return items if first else ",\n" + items
+
+    @classmethod
+    def _write_chunk(cls, file: IO[str], rows: Sequence[Sequence[Any]], columns: Sequence[str], export_format: str,
+                     first: bool) -> None:
+        file.write(cls._serialize(rows, columns, export_format, first))
+
+    async def _export(self, statement: Any, columns: Sequence[str], path: str, export_format: str) -> int:
+        if export_format not in self.FORMATS:
+            raise ValueError(f"Unknown export format: {export_format}")
+
+        exported = 0
+        file = await asyncio.to_thread(open, path, 'w', encoding='utf-8', newline='')
+
+        try:
+            if export_format == 'json':
+                await asyncio.to_thread(file.write, "[\n")
+
+            result = await self.session.stream(statement.execution_options(yield_per=self.chunk_size))
+            async for rows in result.partitions():
+                # serializing in the worker thread as well, only fetching runs on the event loop
+                await asyncio.to_thread(self._write_chunk, file, rows, columns, export_format, exported == 0)
+                exported += len(rows)
+
+            if export_format == 'json':
+                await asyncio.to_thread(file.write, "\n]\n")
+
+            elif exported == 0:
+                await asyncio.to_thread(self._write_chunk, file, [], columns, export_format, True)
+
+        finally:
+            await asyncio.to_thread(file.close)
+
+        return exported
+
+    # ========== EXPORTS ==========
+
+    async def export_words(self, path: str, user_id: Optional[int] = None, export_format: str = 'csv') -> int:
+        """
+        Export the saved words into a file, oldest first
+
+        :param path: path of the file to write
+        :param user_id: ID of the user, the words of all users are exported if None (for admins)
+        :param export_format: "csv" or "json"
+        :return: number of exported words
+        """
+        columns: List[str] = ['word', 'language', 'saved_at']
+        selected = [Lexeme.text, Language.code, UserWord.created_at]
+
+        if user_id is None:
+            columns.insert(0, 'user_id')
+            selected.insert(0, UserWord.user_id)
+
+        statement = (
+            select(*selected)
+            .select_from(UserWord)
+            .join(Lexeme, Lexeme.id == UserWord.lexeme_id)
+            .join(Language, Language.id == Lexeme.language_id)
+        )
+
+        if user_id is None:
+            statement = statement.order_by(UserWord.user_id, UserWord.created_at, UserWord.id)
+
+        else:
+            statement = statement.where(UserWord.user_id == user_id).order_by(UserWord.created_at, UserWord.id)
+
+        exported = await self._export(statement, columns, path, export_format)
+        logger.info(f"Exported {exported} words of {'all users' if user_id is None else f'user {user_id}'}")
+        return exported
+
+    async def export_learning_history(self, path: str, user_id: int, export_format: str = 'csv') -> int:
+        """
+        Export the languages the user has been learning into a file, oldest first
+
+        :param path: path of the file to write
+        :param user_id: ID of the user
+        :param export_format: "csv" or "json"
+        :return: number of exported records
+        """
+        statement = (
+            select(
+                Language.code,
+                user_learning_languages.c.started_learning_at,
+                user_learning_languages.c.finished_learning_at,
+                user_learning_languages.c.is_active
+            )
+            .select_from(user_learning_languages)
+            .join(Language, Language.id == user_learning_languages.c.language_id)
+            .where(user_learning_languages.c.user_id == user_id)
+            .order_by(user_learning_languages.c.started_learning_at)
+        )
+
+        return await self._export(
+            statement, ['language', 'started_at', 'finished_at', 'is_active'], path, export_format
+        )
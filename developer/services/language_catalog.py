@@ -0,0 +1,103 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+from developer.database.models import Language, LanguageTranslation
+from developer.database.session import db_manager
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LanguageEntry:
+    id: int
+    code: str
+    flag_code: Optional[str]
+    is_interface_language: bool
+
+
+class LanguageCatalog:
+    """
+    Immutable snapshot of the languages and their names in every locale.
+
+    Every lookup is a dictionary access, the English name, the first available
+    translation and finally the upper-cased code are precomputed as fallbacks, the
+    same way :meth:`Language.get_name` resolves them.
+    """
+    def __init__(self, languages: Tuple[LanguageEntry, ...], translations: Tuple[Tuple[str, str, str], ...]) -> None:
+        names: Dict[Tuple[str, str], str] = {}
+        fallback_names: Dict[str, str] = {}
+
+        # translations are ordered by id, so the first one seen is the first available
+        for language_code, locale_code, name in translations:
+            names[(language_code, locale_code)] = name
+            fallback_names.setdefault(language_code, name)
+
+        # the English name takes precedence over the first available one
+        for (language_code, locale_code), name in names.items():
+            if locale_code == 'en':
+                fallback_names[language_code] = name
+
+        for language in languages:
+            fallback_names.setdefault(language.code, language.code.upper())
+
+        self._languages: Mapping[str, LanguageEntry] = MappingProxyType({language.code: language for language in languages})
+        self._names: Mapping[Tuple[str, str], str] = MappingProxyType(names)
+        self._fallback_names: Mapping[str, str] = MappingProxyType(fallback_names)
+        self.interface_languages: Tuple[LanguageEntry, ...] = tuple(
+            language for language in languages if language.is_interface_language
+        )
+
+    def __len__(self) -> int:
+        return len(self._languages)
+
+    @classmethod
+    async def load(cls, session: AsyncSession) -> "LanguageCatalog":
+        languages_result = await session.execute(
+            select(Language.id, Language.code, Language.flag_code, Language.is_interface_language)
+            .order_by(Language.id)
+        )
+        languages = tuple(LanguageEntry(*row) for row in languages_result.all())
+
+        locale = aliased(Language)
+        translations_result = await session.execute(
+            select(Language.code, locale.code, LanguageTranslation.name)
+            .join(Language, LanguageTranslation.language_id == Language.id)
+            .join(locale, LanguageTranslation.locale_id == locale.id)
+            .order_by(LanguageTranslation.id)
+        )
+        translations = tuple(tuple(row) for row in translations_result.all())
+
+        return cls(languages, translations)
+
+    def get_language(self, code: str) -> Optional[LanguageEntry]:
+        return self._languages.get(code)
+
+    def get_name(self, language_code: str, locale_code: str = "en") -> str:
+        name = self._names.get((language_code, locale_code))
+        if name is not None:
+            return name
+
+        return self._fallback_names.get(language_code, language_code.upper())
+
+
+class LanguageCatalogManager:
+    """
+    Holds the current language catalog, a new snapshot replaces it on refresh.
+    """
+    def __init__(self) -> None:
+        self.catalog = LanguageCatalog((), ())
+
+    async def refresh(self) -> LanguageCatalog:
+        async with db_manager.get_read_session() as session:
+            self.catalog = await LanguageCatalog.load(session)
+
+        logger.info(f"Language catalog loaded with {len(self.catalog)} languages")
+        return self.catalog
+
+
+# creating global catalog manager
+language_catalog_manager = LanguageCatalogManager()
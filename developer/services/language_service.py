@@ -1,8 +1,18 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy import select, and_, or_, bindparam
 from developer.database.models import Language, LanguageTranslation
-from typing import Optional, List
+from developer.database.loader_profiles import LANGUAGE_WITH_NAMES
+from developer.services.language_catalog import language_catalog_manager
+from typing import Optional, List, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+# prebuilt lookups, the default profile has its own statement, so neither is rebuilt on a call
+LANGUAGE_BY_ID = select(Language).where(Language.id == bindparam('language_id'))
+LANGUAGE_BY_CODE = select(Language).where(Language.code == bindparam('code'))
+LANGUAGE_WITH_NAMES_BY_ID = LANGUAGE_BY_ID.options(*LANGUAGE_WITH_NAMES)
+LANGUAGE_WITH_NAMES_BY_CODE = LANGUAGE_BY_CODE.options(*LANGUAGE_WITH_NAMES)
 
 
 class LanguageService:
@@ -11,38 +21,41 @@ class LanguageService:
 
     # ========== BASIC CRUD OPERATIONS ==========
 
-    async def get_language_by_id(self, language_id: int) -> Optional[Language]:
+    async def get_language_by_id(self, language_id: int, profile: Sequence = LANGUAGE_WITH_NAMES) -> Optional[Language]:
         """
         Receive language by id with translations loaded
         """
-        result = await self.session.execute(
-            select(Language)
-            .options(selectinload(Language.translations).selectinload(LanguageTranslation.locale))
-            .where(Language.id == language_id)
-        )
+        if profile is LANGUAGE_WITH_NAMES:
+            statement = LANGUAGE_WITH_NAMES_BY_ID
+
+        else:
+            statement = LANGUAGE_BY_ID.options(*profile) if profile else LANGUAGE_BY_ID
+
+        result = await self.session.execute(statement, {'language_id': language_id})
         return result.scalars().first()
 
-    async def get_language_by_code(self, code: str) -> Optional[Language]:
+    async def get_language_by_code(self, code: str, profile: Sequence = LANGUAGE_WITH_NAMES) -> Optional[Language]:
         """
         Receive language by code with translations loaded
         :param self:
         :param code:
+        :param profile: loader profile, the names are not loaded with an empty one
         :return:
         """
-        result = await self.session.execute(
-            select(Language)
-            .options(selectinload(Language.translations).selectinload(LanguageTranslation.locale))
-            .where(Language.code == code)
-        )
+        if profile is LANGUAGE_WITH_NAMES:
+            statement = LANGUAGE_WITH_NAMES_BY_CODE
+
+        else:
+            statement = LANGUAGE_BY_CODE.options(*profile) if profile else LANGUAGE_BY_CODE
+
+        result = await self.session.execute(statement, {'code': code})
         return result.scalars().first()
 
     async def get_all_languages(self, interface_only: bool = False) -> List[Language]:
         """
         Receive all languages with translations loaded
         """
-        query = select(Language).options(
-            selectinload(Language.translations).selectinload(LanguageTranslation.locale)
-        )
+        query = select(Language).options(*LANGUAGE_WITH_NAMES)
 
         if interface_only:
             query = query.where(Language.is_interface_language == True)
@@ -56,4 +69,48 @@ class LanguageService:
         :param self:
         :return:
         """
-        return await self.get_all_languages(interface_only=True)
\ No newline at end of file
+        return await self.get_all_languages(interface_only=True)
+
+    # ========== ADMINISTRATION ==========
+
+    async def set_interface_language(self, code: str, is_interface_language: bool = True) -> bool:
+        """
+        Enable or disable a language as an interface language and refresh the language catalog
+
+        :param code: language code
+        :param is_interface_language: whether the language is offered as an interface language
+        :return: True if the language exists
+        """
+        language = await self.get_language_by_code(code, profile=())
+        if not language:
+            return False
+
+        language.is_interface_language = is_interface_language
+        await self.session.commit()
+        await language_catalog_manager.refresh()
+
+        logger.info(f"Language {code} interface flag set to {is_interface_language}")
+        return True
+
+    async def add_translation(self, language_code: str, locale_code: str, name: str) -> Optional[LanguageTranslation]:
+        """
+        Add a name of a language in a locale and refresh the language catalog
+
+        :param language_code: code of the named language
+        :param locale_code: code of the locale the name is in
+        :param name: name of the language
+        :return: created translation or None if one of the languages does not exist
+        """
+        language = await self.get_language_by_code(language_code, profile=())
+        locale = await self.get_language_by_code(locale_code, profile=())
+        if not language or not locale:
+            logger.error(f"Language '{language_code}' or locale '{locale_code}' not found")
+            return None
+
+        translation = LanguageTranslation(language_id=language.id, locale_id=locale.id, name=name)
+        self.session.add(translation)
+        await self.session.commit()
+        await language_catalog_manager.refresh()
+
+        logger.info(f"Added {locale_code} name of language {language_code}")
+        return translation
@@ -1,12 +1,27 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy import select, update, and_, bindparam
 from developer.database.models import PrivacyPolicy, Language
+from developer.database.loader_profiles import POLICY_WITH_LANGUAGE
+from developer.services.document_cache import privacy_policy_cache
+from datetime import datetime
 from typing import Optional, List
 import logging
 
 logger = logging.getLogger(__name__)
 
+# prebuilt, so resolving the policy neither rebuilds the statement nor its cache key
+ACTIVE_POLICY_BY_LOCALE = (
+    select(PrivacyPolicy)
+    .join(Language, PrivacyPolicy.policy_language_id == Language.id)
+    .options(*POLICY_WITH_LANGUAGE)
+    .where(
+        and_(
+            Language.code == bindparam('locale_code'),
+            PrivacyPolicy.is_active == True
+        )
+    )
+)
+
 
 class PrivacyPolicyService:
     def __init__(self, session: AsyncSession) -> None:
@@ -23,35 +38,83 @@ class PrivacyPolicyService:
             active policy exists
         :rtype: Optional[PrivacyPolicy]
         """
-        # At first, try to find an active policy for the requested locale.
-        result = await self.session.execute(
-            select(PrivacyPolicy)
-            .join(Language, PrivacyPolicy.policy_language_id == Language.id)
-            .options(selectinload(PrivacyPolicy.policy_language))
-            .where(
-                and_(
-                    Language.code == locale_code,
-                    PrivacyPolicy.is_active == True
-                )
-            )
+        return await privacy_policy_cache.get(
+            self.session, locale_code, lambda: self._resolve_active_policy(locale_code)
         )
 
+    async def _resolve_active_policy(self, locale_code: str) -> Optional[PrivacyPolicy]:
+        # At first, try to find an active policy for the requested locale.
+        result = await self.session.execute(ACTIVE_POLICY_BY_LOCALE, {'locale_code': locale_code})
         policy = result.scalars().first()
 
         # if not found, try to find an active policy for English locale.
         if not policy and locale_code != 'en':
             logger.info(f"No active policy found for {locale_code}, trying English")
-            result = await self.session.execute(
-                select(PrivacyPolicy)
-                .join(Language, PrivacyPolicy.policy_language_id == Language.id)
-                .options(selectinload(PrivacyPolicy.policy_language))
-                .where(
-                    and_(
-                        Language.code == 'en',
-                        PrivacyPolicy.is_active == True
-                    )
-                )
-            )
+            result = await self.session.execute(ACTIVE_POLICY_BY_LOCALE, {'locale_code': 'en'})
             policy = result.scalars().first()
 
         return policy
+
+    async def activate_policy(self, policy_id: int, admin_user_id: int) -> bool:
+        """
+        Активировать политику конфиденциальности (и деактивировать другие для того же языка)
+
+        :param policy_id: ID политики
+        :param admin_user_id: ID администратора
+        :return: успешно ли активирована
+        """
+        policy_result = await self.session.execute(
+            select(PrivacyPolicy)
+            .options(*POLICY_WITH_LANGUAGE)
+            .where(PrivacyPolicy.id == policy_id)
+        )
+        policy = policy_result.scalars().first()
+
+        if not policy:
+            return False
+
+        # Деактивируем все другие политики для этого языка
+        await self.session.execute(
+            update(PrivacyPolicy)
+            .where(
+                and_(
+                    PrivacyPolicy.policy_language_id == policy.policy_language_id,
+                    PrivacyPolicy.id != policy_id
+                )
+            )
+            .values(is_active=False)
+        )
+
+        policy.is_active = True
+        policy.activated_at = datetime.now()
+        policy.activated_by_id = admin_user_id
+
+        await privacy_policy_cache.invalidate(self.session)
+        await self.session.commit()
+        logger.info(f"Activated privacy policy {policy.version} for language {policy.policy_language.code}")
+        return True
+
+    async def deactivate_policy(self, policy_id: int, admin_user_id: int) -> bool:
+        """
+        Деактивировать политику конфиденциальности
+
+        :param policy_id: ID политики
+        :param admin_user_id: ID администратора
+        :return: успешно ли деактивирована
+        """
+        policy_result = await self.session.execute(
+            select(PrivacyPolicy).where(PrivacyPolicy.id == policy_id)
+        )
+        policy = policy_result.scalars().first()
+
+        if not policy:
+            return False
+
+        policy.is_active = False
+        policy.deactivated_at = datetime.now()
+        policy.deactivated_by_id = admin_user_id
+
+        await privacy_policy_cache.invalidate(self.session)
+        await self.session.commit()
+        logger.info(f"Deactivated privacy policy {policy.version}")
+        return True
@@ -0,0 +1,209 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, or_, bindparam, DateTime
+from dataclasses import dataclass
+from datetime import datetime
+from time import monotonic
+from contextlib import AbstractAsyncContextManager
+from typing import Callable, Dict, Optional
+from developer.database.models import PromoCode
+from developer.database.session import db_manager
+from config import get_config
+import asyncio
+import logging
+
+Config = get_config()
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ActivePromoCode:
+    id: int
+    code: str
+    discount_percent: int
+    discount_amount: float
+    uses_limit: Optional[int]
+    valid_from: datetime
+    valid_until: datetime
+
+
+@dataclass
+class PromoRedemption:
+    promo_code_id: int
+    discount_percent: int
+    discount_amount: float
+    uses_count: int
+    uses_limit: Optional[int]
+
+
+# one conditional statement takes a use, so concurrent redemptions can never overshoot the limit
+REDEEM_PROMO_CODE = (
+    update(PromoCode)
+    .where(
+        PromoCode.id == bindparam('promo_code_id'),
+        PromoCode.is_active == True,
+        or_(PromoCode.uses_limit.is_(None), PromoCode.uses_count < PromoCode.uses_limit),
+        bindparam('now', type_=DateTime).between(PromoCode.valid_from, PromoCode.valid_until)
+    )
+    .values(uses_count=PromoCode.uses_count + 1)
+    .returning(PromoCode.uses_count, PromoCode.uses_limit, PromoCode.discount_percent, PromoCode.discount_amount)
+    .execution_options(synchronize_session=False)
+)
+
+ACTIVE_PROMO_CODES = (
+    select(PromoCode.id, PromoCode.code, PromoCode.discount_percent, PromoCode.discount_amount,
+           PromoCode.uses_limit, PromoCode.uses_count, PromoCode.valid_from, PromoCode.valid_until)
+    .where(PromoCode.is_active == True, PromoCode.valid_until >= bindparam('now', type_=DateTime))
+)
+
+
+class ActivePromoCodeCache:
+    """
+    In-memory snapshot of the active promo codes, reloaded with one query at most every
+    ``ttl`` seconds. Concurrent callers wait for the reload in progress instead of
+    issuing their own, so unknown and expired codes are rejected without any query.
+
+    The snapshot also keeps the number of remaining uses of every limited code, as seen
+    by the last reload or redemption, and the number of redemptions in flight. A code
+    gets no more in-flight redemptions than it has uses left, the ones beyond are
+    rejected right away instead of queueing for the writer. Uses are only ever taken,
+    so the estimate never rejects a redemption the database would accept, unless one
+    in flight fails.
+    """
+    def __init__(self, ttl: float = 30.0) -> None:
+        self.ttl = ttl
+
+        self._codes: Dict[str, ActivePromoCode] = {}
+        self._remaining: Dict[int, int] = {}
+        self._in_flight: Dict[int, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and monotonic() - self._loaded_at < self.ttl
+
+    async def _reload(self, session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]]) -> None:
+        async with session_factory() as session:
+            result = await session.execute(ACTIVE_PROMO_CODES, {'now': datetime.now()})
+            rows = result.all()
+
+        codes, remaining = {}, {}
+        for row in rows:
+            codes[row.code] = ActivePromoCode(row.id, row.code, row.discount_percent, row.discount_amount,
+                                              row.uses_limit, row.valid_from, row.valid_until)
+            if row.uses_limit is not None:
+                remaining[row.id] = max(row.uses_limit - row.uses_count, 0)
+
+        self._codes, self._remaining = codes, remaining
+        self._loaded_at = monotonic()
+        logger.debug(f"Loaded {len(codes)} active promo codes")
+
+    async def get(self, session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]],
+                  code: str) -> Optional[ActivePromoCode]:
+        """
+        Receive an active promo code, reloading the snapshot if it is stale
+
+        :param session_factory: factory of the read session used for the reload
+        :param code: the promo code
+        :return: the promo code or None if it is unknown or inactive
+        """
+        if not self._is_fresh():
+            async with self._lock:
+                if not self._is_fresh():
+                    await self._reload(session_factory)
+
+        return self._codes.get(code)
+
+    # ========== IN-FLIGHT REDEMPTIONS ==========
+
+    def acquire(self, promo_code: ActivePromoCode) -> bool:
+        in_flight = self._in_flight.get(promo_code.id, 0)
+        if promo_code.uses_limit is not None and in_flight >= self._remaining.get(promo_code.id, 0):
+            return False
+
+        self._in_flight[promo_code.id] = in_flight + 1
+        return True
+
+    def release(self, promo_code: ActivePromoCode, uses_left: Optional[int] = None) -> None:
+        """
+        Finish an in-flight redemption
+
+        :param promo_code: the promo code
+        :param uses_left: uses left after the redemption, 0 if the code turned out exhausted
+            or deactivated, None if the redemption failed and the estimate is kept
+        """
+        self._in_flight[promo_code.id] -= 1
+        if not self._in_flight[promo_code.id]:
+            del self._in_flight[promo_code.id]
+
+        if promo_code.uses_limit is not None and uses_left is not None:
+            self._remaining[promo_code.id] = max(uses_left, 0)
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+        logger.debug("Active promo codes cache invalidated")
+
+
+class PromoCodeService:
+    """
+    Redeems promo codes. The active codes cache is read through a read session, a write
+    session is opened only for a redemption the cache let through, so the rejected
+    redemptions never queue for the writer.
+    """
+    def __init__(
+            self,
+            session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]] = None,
+            read_session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]] = None
+    ) -> None:
+        self.session_factory = session_factory or db_manager.get_write_session
+        self.read_session_factory = read_session_factory or db_manager.get_read_session
+
+    async def redeem(self, code: str) -> Optional[PromoRedemption]:
+        """
+        Take one use of a promo code. The use is taken by a single conditional UPDATE,
+        the active codes cache only rejects the codes which can't be redeemed before it
+
+        :param code: the promo code entered by the user
+        :return: the discount of the code or None if the code is unknown, inactive,
+            out of its validity period or exhausted
+        """
+        promo_code = await active_promo_codes.get(self.read_session_factory, code.strip())
+        if promo_code is None:
+            return None
+
+        now = datetime.now()
+        if not promo_code.valid_from <= now <= promo_code.valid_until:
+            return None
+
+        if not active_promo_codes.acquire(promo_code):
+            logger.debug(f"Promo code {promo_code.code} has no uses left for another redemption")
+            return None
+
+        try:
+            async with self.session_factory() as session:
+                result = await session.execute(REDEEM_PROMO_CODE, {'promo_code_id': promo_code.id, 'now': now})
+                row = result.first()
+                await session.commit()
+
+        except Exception:
+            active_promo_codes.release(promo_code)
+            raise
+
+        if row is None:
+            # exhausted or deactivated meanwhile, rejected without a query until the next reload
+            active_promo_codes.release(promo_code, uses_left=0)
+            logger.info(f"Promo code {promo_code.code} could not be redeemed")
+            return None
+
+        redemption = PromoRedemption(promo_code.id, row.discount_percent, row.discount_amount,
+                                     row.uses_count, row.uses_limit)
+        active_promo_codes.release(
+            promo_code, uses_left=row.uses_limit - row.uses_count if row.uses_limit is not None else None
+        )
+
+        logger.debug(f"Redeemed promo code {promo_code.code}, use {redemption.uses_count}")
+        return redemption
+
+
+# creating global active promo codes cache
+active_promo_codes = ActivePromoCodeCache(ttl=Config.PROMO_CODE_CACHE_TTL)
@@ -0,0 +1,115 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, insert, func
+from sqlalchemy.engine import Row
+from developer.database.models import Token, TokenUsageDaily
+from developer.database.batching import write_batcher
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TokenService:
+    def __init__(self, session: AsyncSession = None) -> None:
+        self.session = session
+
+    async def record_usage(self, user_id: int, token_count: int, cost: float) -> int:
+        """
+        Record tokens spent by one AI call, the row is committed together with
+        other small writes by the write batcher, the daily rollup is updated by
+        a trigger in the same transaction
+
+        :param user_id: ID of the user
+        :param token_count: number of spent tokens
+        :param cost: cost of the call
+        :return: ID of the token usage row, once it is committed
+        """
+        return await write_batcher.insert(Token, user_id=user_id, token_count=token_count, cost=cost)
+
+    # ========== USAGE FROM DAILY ROLLUPS ==========
+    # days are UTC dates, the same as the server timestamps of the token rows
+
+    @staticmethod
+    def get_today() -> date:
+        return datetime.now(timezone.utc).date()
+
+    async def get_daily_usage(self, user_id: int, day: Optional[date] = None) -> Optional[TokenUsageDaily]:
+        """
+        Receive the usage of the user for a single day, today by default
+
+        :param user_id: ID of the user
+        :param day: UTC date
+        :return: rollup of the day or None if nothing was spent
+        """
+        return await self.session.get(TokenUsageDaily, (user_id, day or self.get_today()))
+
+    async def get_usage(self, user_id: int, since: Optional[date] = None, until: Optional[date] = None) -> Row:
+        """
+        Receive the total usage of the user over a range of days, both ends included
+
+        :param user_id: ID of the user
+        :param since: first UTC date of the range, the whole history by default
+        :param until: last UTC date of the range, today by default
+        :return: row of (token_count, cost, calls)
+        """
+        query = (
+            select(
+                func.coalesce(func.sum(TokenUsageDaily.token_count), 0).label('token_count'),
+                func.coalesce(func.sum(TokenUsageDaily.cost), 0.0).label('cost'),
+                func.coalesce(func.sum(TokenUsageDaily.calls), 0).label('calls'),
+            )
+            .where(TokenUsageDaily.user_id == user_id)
+        )
+
+        if since is not None:
+            query = query.where(TokenUsageDaily.day >= since)
+
+        if until is not None:
+            query = query.where(TokenUsageDaily.day <= until)
+
+        result = await self.session.execute(query)
+        return result.one()
+
+    async def get_usage_for_last_days(self, user_id: int, days: int) -> Row:
+        """
+        Receive the total usage of the user over the last days including today
+        """
+        return await self.get_usage(user_id, since=self.get_today() - timedelta(days=days - 1))
+
+    async def get_usage_history(self, user_id: int, days: int = 30) -> List[TokenUsageDaily]:
+        """
+        Receive the daily rollups of the user for the last days, newest first
+        """
+        result = await self.session.execute(
+            select(TokenUsageDaily)
+            .where(
+                TokenUsageDaily.user_id == user_id,
+                TokenUsageDaily.day >= self.get_today() - timedelta(days=days - 1)
+            )
+            .order_by(TokenUsageDaily.day.desc())
+        )
+        return result.scalars().all()
+
+    # ========== MAINTENANCE ==========
+
+    async def rebuild_daily_rollups(self) -> int:
+        """
+        Rebuild the daily rollups from the token usage rows, e.g. after they were changed by hand
+
+        :return: number of rollup rows
+        """
+        day = func.date(Token.created_at)
+
+        await self.session.execute(delete(TokenUsageDaily))
+        result = await self.session.execute(
+            insert(TokenUsageDaily).from_select(
+                ['user_id', 'day', 'token_count', 'cost', 'calls'],
+                select(Token.user_id, day, func.sum(Token.token_count), func.sum(Token.cost), func.count())
+                .group_by(Token.user_id, day)
+            )
+        )
+        await self.session.commit()
+
+        logger.info(f"Rebuilt {result.rowcount} daily token usage rollups")
+        return result.rowcount
@@ -1,12 +1,27 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy import select, update, and_, bindparam
 from developer.database.models import UserAgreement, Language
+from developer.database.loader_profiles import AGREEMENT_WITH_LANGUAGE
+from developer.services.document_cache import user_agreement_cache
+from datetime import datetime
 from typing import Optional, List
 import logging
 
 logger = logging.getLogger(__name__)
 
+# prebuilt, so resolving the agreement neither rebuilds the statement nor its cache key
+ACTIVE_AGREEMENT_BY_LOCALE = (
+    select(UserAgreement)
+    .join(Language, UserAgreement.agreement_language_id == Language.id)
+    .options(*AGREEMENT_WITH_LANGUAGE)
+    .where(
+        and_(
+            Language.code == bindparam('locale_code'),
+            UserAgreement.is_active == True
+        )
+    )
+)
+
 
 class UserAgreementService:
     def __init__(self, session: AsyncSession) -> None:
@@ -26,35 +41,19 @@ class UserAgreementService:
             no active agreement is found.
         :rtype: Optional[UserAgreement]
         """
-        # At first, try to find an active agreement for the requested locale.
-        result = await self.session.execute(
-            select(UserAgreement)
-            .join(Language, UserAgreement.agreement_language_id == Language.id)
-            .options(selectinload(UserAgreement.agreement_language))
-            .where(
-                and_(
-                    Language.code == locale_code,
-                    UserAgreement.is_active == True
-                )
-            )
+        return await user_agreement_cache.get(
+            self.session, locale_code, lambda: self._resolve_active_agreement(locale_code)
         )
 
+    async def _resolve_active_agreement(self, locale_code: str) -> Optional[UserAgreement]:
+        # At first, try to find an active agreement for the requested locale.
+        result = await self.session.execute(ACTIVE_AGREEMENT_BY_LOCALE, {'locale_code': locale_code})
         agreement = result.scalars().first()
 
         # if not found, try to find an active agreement for English locale.
         if not agreement and locale_code != 'en':
             logger.info(f"No active agreement found for {locale_code}, trying English")
-            result = await self.session.execute(
-                select(UserAgreement)
-                .join(Language, UserAgreement.agreement_language_id == Language.id)
-                .options(selectinload(UserAgreement.agreement_language))
-                .where(
-                    and_(
-                        Language.code == 'en',
-                        UserAgreement.is_active == True
-                    )
-                )
-            )
+            result = await self.session.execute(ACTIVE_AGREEMENT_BY_LOCALE, {'locale_code': 'en'})
             agreement = result.scalars().first()
 
         return agreement
@@ -68,7 +67,7 @@ class UserAgreementService:
         """
         result = await self.session.execute(
             select(UserAgreement)
-            .options(selectinload(UserAgreement.agreement_language))
+            .options(*AGREEMENT_WITH_LANGUAGE)
             .where(
                 and_(
                     UserAgreement.agreement_language_id == language_id,
@@ -82,7 +81,7 @@ class UserAgreementService:
         """Получить все активные соглашения"""
         result = await self.session.execute(
             select(UserAgreement)
-            .options(selectinload(UserAgreement.agreement_language))
+            .options(*AGREEMENT_WITH_LANGUAGE)
             .where(UserAgreement.is_active == True)
             .order_by(UserAgreement.version.desc(), UserAgreement.created_at.desc())
         )
@@ -92,7 +91,7 @@ class UserAgreementService:
         """Получить все соглашения определенной версии"""
         result = await self.session.execute(
             select(UserAgreement)
-            .options(selectinload(UserAgreement.agreement_language))
+            .options(*AGREEMENT_WITH_LANGUAGE)
             .where(UserAgreement.version == version)
             .order_by(UserAgreement.agreement_language_id)
         )
@@ -108,7 +107,7 @@ class UserAgreementService:
         result = await self.session.execute(
             select(UserAgreement)
             .join(Language, UserAgreement.agreement_language_id == Language.id)
-            .options(selectinload(UserAgreement.agreement_language))
+            .options(*AGREEMENT_WITH_LANGUAGE)
             .where(Language.code == locale_code)
             .order_by(UserAgreement.version.desc(), UserAgreement.created_at.desc())
         )
@@ -162,6 +161,9 @@ class UserAgreementService:
         )
 
         self.session.add(agreement)
+        if is_active:
+            await user_agreement_cache.invalidate(self.session)
+
         await self.session.commit()
         await self.session.refresh(agreement)
 
@@ -179,7 +181,7 @@ class UserAgreementService:
         # Получаем соглашение
         agreement_result = await self.session.execute(
             select(UserAgreement)
-            .options(selectinload(UserAgreement.agreement_language))
+            .options(*AGREEMENT_WITH_LANGUAGE)
             .where(UserAgreement.id == agreement_id)
         )
         agreement = agreement_result.scalars().first()
@@ -204,6 +206,7 @@ class UserAgreementService:
         agreement.activated_at = datetime.now()
         agreement.activated_by_id = admin_user_id
 
+        await user_agreement_cache.invalidate(self.session)
         await self.session.commit()
         logger.info(f"Activated agreement {agreement.version} for language {agreement.agreement_language.code}")
         return True
@@ -228,6 +231,7 @@ class UserAgreementService:
         agreement.deactivated_at = datetime.now()
         agreement.deactivated_by_id = admin_user_id
 
+        await user_agreement_cache.invalidate(self.session)
         await self.session.commit()
         logger.info(f"Deactivated agreement {agreement.version}")
         return True
@@ -1,17 +1,65 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from developer.database.models import User
-from typing import Optional
+from sqlalchemy import select, func, bindparam
+from sqlalchemy.engine import Row
+from developer.database.models import User, Language, user_learning_languages
+from typing import Optional, Sequence
+
+# ========== PREBUILT STATEMENTS ==========
+# the hot queries are built once with bound parameters, so a call neither rebuilds the
+# construct nor recomputes its cache key, the compiled SQL is taken from the statement cache
+
+USER_BY_TELEGRAM_ID = select(User).where(User.telegram_id == bindparam('telegram_id'))
+
+USER_LANGUAGE = (
+    select(Language.code)
+    .join(User, User.interface_language_id == Language.id)
+    .where(User.telegram_id == bindparam('telegram_id'))
+)
+
+USER_REGISTRATION_STATUS = (
+    select(
+        User.id,
+        Language.code.label('language_code'),
+        User.agreed_to_terms_of_service,
+        User.is_confirmed
+    )
+    .join(Language, User.interface_language_id == Language.id)
+    .where(User.telegram_id == bindparam('telegram_id'))
+)
+
+USER_ADMIN_STATUS = (
+    select(User.id, User.is_admin, User.is_confirmed)
+    .where(User.telegram_id == bindparam('telegram_id'))
+)
+
+_active_learning_language_id = (
+    select(user_learning_languages.c.language_id)
+    .where(
+        user_learning_languages.c.user_id == User.id,
+        user_learning_languages.c.is_active == True
+    )
+    .order_by(user_learning_languages.c.started_learning_at.desc())
+    .limit(1)
+    .scalar_subquery()
+)
+
+USER_WORD_LANGUAGE = (
+    select(User.id, func.coalesce(_active_learning_language_id, User.interface_language_id).label('language_id'))
+    .where(User.telegram_id == bindparam('telegram_id'))
+)
 
 
 class UserService:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
-    async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[User]:
-        result = await self.session.execute(
-            select(User).filter_by(telegram_id=telegram_id)
-        )
+    async def get_user_by_telegram_id(self, telegram_id: int, profile: Sequence = ()) -> Optional[User]:
+        """
+        Receive the user, no relationship is loaded unless a loader profile is given,
+        e.g. USER_WITH_INTERFACE_LANGUAGE for User.language_code
+        """
+        statement = USER_BY_TELEGRAM_ID.options(*profile) if profile else USER_BY_TELEGRAM_ID
+        result = await self.session.execute(statement, {'telegram_id': telegram_id})
 
         return result.scalars().one_or_none()
 
@@ -31,8 +79,45 @@ class UserService:
 
         return user
 
-    async def get_user_language(self, telegram_id: int) -> str:
-        user = await self.get_user_by_telegram_id(telegram_id)
-        return user.language_code if user else None
+    # ========== PROJECTIONS FOR HOT PATHS ==========
+    # these methods fetch only the needed columns in a single query and return plain rows,
+    # so no ORM object is built and the identity map is not involved
+
+    async def get_user_language(self, telegram_id: int) -> Optional[str]:
+        """
+        Receive the interface language code of the user
+        """
+        result = await self.session.execute(USER_LANGUAGE, {'telegram_id': telegram_id})
+        return result.scalar_one_or_none()
+
+    async def get_user_registration_status(self, telegram_id: int) -> Optional[Row]:
+        """
+        Receive the interface language code and the registration flags of the user
+
+        :param telegram_id: telegram ID of the user
+        :return: row of (id, language_code, agreed_to_terms_of_service, is_confirmed)
+            or None if the user is not registered
+        """
+        result = await self.session.execute(USER_REGISTRATION_STATUS, {'telegram_id': telegram_id})
+        return result.first()
+
+    async def get_user_admin_status(self, telegram_id: int) -> Optional[Row]:
+        """
+        Receive the admin flags of the user
+
+        :param telegram_id: telegram ID of the user
+        :return: row of (id, is_admin, is_confirmed) or None if the user is not registered
+        """
+        result = await self.session.execute(USER_ADMIN_STATUS, {'telegram_id': telegram_id})
+        return result.first()
 
+    async def get_user_word_language(self, telegram_id: int) -> Optional[Row]:
+        """
+        Receive the language new words of the user are saved in: the active learning
+        language, or the interface language if the user does not learn any
 
+        :param telegram_id: telegram ID of the user
+        :return: row of (id, language_id) or None if the user is not registered
+        """
+        result = await self.session.execute(USER_WORD_LANGUAGE, {'telegram_id': telegram_id})
+        return result.first()
@@ -0,0 +1,174 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, literal
+from sqlalchemy.dialects.sqlite import insert
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional
+from developer.database.models import Lexeme, UserWord
+from developer.database.session import db_manager
+from developer.services.word_service import normalize_word
+from developer.services.word_index import word_index
+from config import get_config
+import asyncio
+import csv
+import html
+import itertools
+import os
+import re
+import logging
+
+Config = get_config()
+
+logger = logging.getLogger(__name__)
+
+# separators of the Anki text export header, e.g. "#separator:tab"
+ANKI_SEPARATORS = {
+    'tab': '\t', 'comma': ',', 'semicolon': ';', 'space': ' ', 'pipe': '|', 'colon': ':',
+}
+
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+
+@dataclass
+class WordImportResult:
+    rows: int = 0
+    words: int = 0
+    added: int = 0
+
+
+class WordImportService:
+    """
+    Imports words from CSV, TSV and Anki text exports into the user's vocabulary.
+
+    The file is read in a worker thread batch by batch, the first column of every row is the
+    word. Every batch is deduplicated by the normalized form and written in its own short
+    transaction with two bulk statements, so the memory does not depend on the file size and
+    other writers are not locked out for the whole import.
+    """
+    SUPPORTED_EXTENSIONS = ('.csv', '.tsv', '.txt')
+
+    def __init__(
+            self,
+            session_factory: Callable[[], AbstractAsyncContextManager[AsyncSession]] = None,
+            batch_size: int = 1000
+    ) -> None:
+        self.session_factory = session_factory or db_manager.get_write_session
+        self.batch_size = batch_size
+
+    # ========== READING ==========
+
+    @staticmethod
+    def read_words(path: str) -> Iterator[str]:
+        """
+        Read the words of a file lazily, row by row
+
+        :param path: path of a .csv, .tsv or .txt (Anki export) file
+        :return: iterator over the first column of every row
+        """
+        delimiter = ',' if path.lower().endswith('.csv') else '\t'
+        strip_html = False
+
+        with open(path, 'r', encoding='utf-8-sig', errors='replace', newline='') as file:
+            # the header lines of an Anki export, e.g. "#separator:tab" or "#html:true"
+            first_line = ''
+            for first_line in file:
+                if not first_line.startswith('#'):
+                    break
+
+                name, _, value = first_line[1:].strip().partition(':')
+                if name == 'separator':
+                    delimiter = ANKI_SEPARATORS.get(value.lower(), value[:1] or delimiter)
+
+                elif name == 'html':
+                    strip_html = value.lower() == 'true'
+
+                first_line = ''
+
+            for row in csv.reader(itertools.chain([first_line], file), delimiter=delimiter):
+                if not row:
+                    continue
+
+                word = row[0]
+                if strip_html:
+                    word = html.unescape(HTML_TAG_PATTERN.sub(' ', word))
+
+                yield word
+
+    def _read_batches(self, path: str) -> Iterator[List[str]]:
+        words = self.read_words(path)
+        while True:
+            batch = list(itertools.islice(words, self.batch_size))
+            if not batch:
+                return
+
+            yield batch
+
+    # ========== WRITING ==========
+
+    async def _write_batch(self, user_id: int, language_id: int, lexemes: Dict[str, str]) -> int:
+        async with self.session_factory() as session:
+            await session.execute(
+                insert(Lexeme).on_conflict_do_nothing(),
+                [{'language_id': language_id, 'normalized': normalized, 'text': text}
+                 for normalized, text in lexemes.items()]
+            )
+            result = await session.execute(
+                insert(UserWord)
+                .from_select(
+                    ['user_id', 'lexeme_id'],
+                    select(literal(user_id), Lexeme.id)
+                    .where(Lexeme.language_id == language_id, Lexeme.normalized.in_(list(lexemes)))
+                )
+                .on_conflict_do_nothing()
+            )
+            await session.commit()
+
+        return result.rowcount
+
+    async def import_file(self, path: str, user_id: int, language_id: int,
+                          progress: Optional[Callable[[WordImportResult], Awaitable[None]]] = None
+                          ) -> WordImportResult:
+        """
+        Import the words of a file into the user's vocabulary
+
+        :param path: path of the file
+        :param user_id: ID of the user
+        :param language_id: ID of the language of the words
+        :param progress: coroutine function called with the current result after every batch
+        :return: numbers of read rows, of words and of words new to the user
+        """
+        result = WordImportResult()
+        batches = self._read_batches(path)
+
+        try:
+            while True:
+                batch = await asyncio.to_thread(next, batches, None)
+                if batch is None:
+                    break
+
+                result.rows += len(batch)
+
+                # the first spelling of a word within the batch is kept
+                lexemes = {}
+                for word in batch:
+                    text = " ".join(word.split())[:100]
+                    normalized = normalize_word(text)
+                    if normalized:
+                        lexemes.setdefault(normalized, text)
+
+                if lexemes:
+                    result.words += len(lexemes)
+                    result.added += await self._write_batch(user_id, language_id, lexemes)
+
+                if progress is not None:
+                    await progress(result)
+
+        finally:
+            batches.close()
+
+            if result.added:
+                word_index.invalidate(user_id)
+
+        logger.info(f"Imported {result.added} new words of {result.rows} rows from "
+                    f"{os.path.basename(path)} for user {user_id}")
+        return result
@@ -0,0 +1,140 @@
+import asyncio
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from developer.database.models import User, UserWord, Lexeme
+from developer.database.session import db_manager
+from config import get_config
+import logging
+
+Config = get_config()
+
+logger = logging.getLogger(__name__)
+
+
+class UserWordIndex:
+    """
+    Sorted, immutable index of a single user's words for prefix lookups.
+    """
+    def __init__(self, user_id: Optional[int], words: List[Tuple[int, str]]) -> None:
+        self.user_id = user_id
+        entries = sorted((word.casefold(), word_id, word) for word_id, word in words)
+        self._keys = [entry[0] for entry in entries]
+        self._entries = [(entry[1], entry[2]) for entry in entries]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def search(self, prefix: str, offset: int = 0, limit: int = 50) -> List[Tuple[int, str]]:
+        prefix = prefix.strip().casefold()
+        start = bisect_left(self._keys, prefix) + offset
+        found = []
+
+        for position in range(start, min(start + limit, len(self._keys))):
+            if not self._keys[position].startswith(prefix):
+                break
+
+            found.append(self._entries[position])
+
+        return found
+
+
+class WordPrefixIndex:
+    """
+    In-memory prefix index over the users' saved words, used by the inline search.
+
+    A user's index is built lazily on the first lookup and dropped as soon as the
+    user saves a new word, only ``max_users`` most recently used indexes are kept.
+    """
+    def __init__(self, max_users: int = 1000) -> None:
+        self.max_users = max_users
+        self._indexes: "OrderedDict[int, UserWordIndex]" = OrderedDict()
+        self._telegram_ids: Dict[int, int] = {}
+        self._loading: Dict[int, asyncio.Future] = {}
+
+        # the generation of the latest invalidation of every user, kept only while indexes are loading
+        self._generation = 0
+        self._invalidated_at: Dict[int, int] = {}
+
+    async def _load(self, telegram_id: int) -> UserWordIndex:
+        async with db_manager.get_read_session() as session:
+            result = await session.execute(
+                select(User.id, UserWord.id, Lexeme.text)
+                .outerjoin(UserWord, UserWord.user_id == User.id)
+                .outerjoin(Lexeme, Lexeme.id == UserWord.lexeme_id)
+                .where(User.telegram_id == telegram_id)
+            )
+            rows = result.all()
+
+        user_id = rows[0][0] if rows else None
+        words = [(word_id, word) for _, word_id, word in rows if word_id is not None]
+        logger.debug(f"Word index for user {telegram_id} warmed up with {len(words)} words")
+        return UserWordIndex(user_id, words)
+
+    async def get_index(self, telegram_id: int) -> UserWordIndex:
+        index = self._indexes.get(telegram_id)
+        if index is not None:
+            self._indexes.move_to_end(telegram_id)
+            return index
+
+        # concurrent lookups of the same user share a single load
+        loading = self._loading.get(telegram_id)
+        if loading is not None:
+            return await loading
+
+        loading = asyncio.get_running_loop().create_future()
+        self._loading[telegram_id] = loading
+        generation = self._generation
+
+        try:
+            index = await self._load(telegram_id)
+            loading.set_result(index)
+            is_current = self._invalidated_at.get(index.user_id, 0) <= generation
+
+        except Exception as e:
+            loading.set_exception(e)
+            # marking the exception retrieved, it is raised here and to the waiters if there are any
+            loading.exception()
+            raise
+
+        finally:
+            self._loading.pop(telegram_id, None)
+            if not self._loading:
+                self._invalidated_at.clear()
+
+        # the index is cached only if the user saved no word while it was loading,
+        # unregistered users are not cached, so they see their words right after registration
+        if index.user_id is not None and is_current:
+            self._store(telegram_id, index)
+
+        return index
+
+    def _store(self, telegram_id: int, index: UserWordIndex) -> None:
+        self._indexes[telegram_id] = index
+        self._telegram_ids[index.user_id] = telegram_id
+
+        while len(self._indexes) > self.max_users:
+            _, evicted_index = self._indexes.popitem(last=False)
+            self._telegram_ids.pop(evicted_index.user_id, None)
+
+    async def search(self, telegram_id: int, prefix: str, offset: int = 0, limit: int = 50) -> List[Tuple[int, str]]:
+        index = await self.get_index(telegram_id)
+        return index.search(prefix, offset, limit)
+
+    def invalidate(self, user_id: int) -> None:
+        if self._loading:
+            self._generation += 1
+            self._invalidated_at[user_id] = self._generation
+
+        telegram_id = self._telegram_ids.pop(user_id, None)
+        if telegram_id is not None:
+            self._indexes.pop(telegram_id, None)
+
+    def clear(self) -> None:
+        self._indexes.clear()
+        self._telegram_ids.clear()
+
+
+# creating global index
+word_index = WordPrefixIndex(max_users=Config.WORD_INDEX_MAX_USERS)
@@ -0,0 +1,217 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, bindparam, column, literal_column, table, tuple_, type_coerce, Integer, String
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.engine import Row
+from developer.database.models import Lexeme, UserWord
+from developer.database.loader_profiles import USER_WORD_WITH_LEXEME
+from developer.database.batching import write_batcher
+from developer.services.word_index import word_index
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import asyncio
+import unicodedata
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_word(word: str) -> str:
+    """
+    Normalized form of a word, lexemes are deduplicated by it within a language
+    """
+    return " ".join(unicodedata.normalize("NFC", word).split()).casefold()
+
+
+def build_match_expression(query: str, mode: str = "prefix") -> Optional[str]:
+    """
+    FTS5 query for the words of a user's search query, the FTS5 syntax of the query itself is ignored
+
+    :param query: search query
+    :param mode: "prefix" - every term starts a word of the lexeme,
+        "phrase" - all the terms in this order, "any" - any of the terms
+    :return: FTS5 MATCH expression or None if the query has no terms
+    """
+    terms = re.findall(r"\w+", unicodedata.normalize("NFC", query))
+    if not terms:
+        return None
+
+    if mode == "prefix":
+        return " ".join(f'"{term}"*' for term in terms)
+
+    if mode == "phrase":
+        return '"' + " ".join(terms) + '"'
+
+    if mode == "any":
+        return " OR ".join(f'"{term}"' for term in terms)
+
+    raise ValueError(f"Unknown search mode: {mode}")
+
+
+lexemes_fts = table("lexemes_fts", column("rowid"), column("rank"))
+
+# keyset pagination compares the stored created_at values as they are, so the cursor matches
+# the index order exactly whatever the precision of every stored timestamp is
+user_word_created_key = type_coerce(UserWord.created_at, String)
+
+# (created_at as stored, id) of a user's word
+WordsCursor = Tuple[str, int]
+
+
+@dataclass
+class WordsPage:
+    words: List[Row]
+    newer_cursor: Optional[WordsCursor] = None
+    older_cursor: Optional[WordsCursor] = None
+
+
+# the statements are shared, so the write batcher sends concurrent saves in one batch.
+# a no-op update on conflict makes the existing row id returned as well
+_lexeme_upsert = insert(Lexeme)
+LEXEME_UPSERT = _lexeme_upsert.on_conflict_do_update(
+    index_elements=[Lexeme.language_id, Lexeme.normalized],
+    set_={'normalized': _lexeme_upsert.excluded.normalized}
+).returning(Lexeme.id, sort_by_parameter_order=True)
+
+# the lexeme is looked up by its natural key, so the user's word is written in the same batch as the lexeme.
+# an INSERT ... SELECT on the table, the ORM bulk insert of the batcher does not take one
+_user_word_upsert = insert(UserWord.__table__).from_select(
+    ['user_id', 'lexeme_id'],
+    select(bindparam('user_id', type_=Integer), Lexeme.id)
+    .where(Lexeme.language_id == bindparam('language_id'), Lexeme.normalized == bindparam('normalized'))
+)
+USER_WORD_UPSERT = _user_word_upsert.on_conflict_do_update(
+    index_elements=[UserWord.user_id, UserWord.lexeme_id],
+    set_={'lexeme_id': _user_word_upsert.excluded.lexeme_id}
+).returning(UserWord.id)
+
+
+class WordService:
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def get_user_words(self, user_id: int) -> List[UserWord]:
+        """
+        Receive all words saved by the user with their lexemes loaded
+        """
+        result = await self.session.execute(
+            select(UserWord)
+            .options(*USER_WORD_WITH_LEXEME)
+            .where(UserWord.user_id == user_id)
+            .order_by(UserWord.created_at.desc(), UserWord.id.desc())
+        )
+        return result.scalars().all()
+
+    async def get_words_page(self, user_id: int, cursor: Optional[WordsCursor] = None, newer: bool = False,
+                             limit: int = 10) -> WordsPage:
+        """
+        Receive a page of the user's words, newest first, with keyset pagination over
+        (user_id, created_at, id), so every page costs the same index range scan
+
+        :param user_id: ID of the user
+        :param cursor: the first or the last word of the current page, the newest page if None
+        :param newer: whether the page of newer words before the cursor is requested,
+            otherwise the page of older words after the cursor
+        :param limit: number of words on a page
+        :return: rows of (id, text, created_key) with the cursors of the neighbouring pages
+        """
+        statement = (
+            select(UserWord.id, Lexeme.text, user_word_created_key.label('created_key'))
+            .join(Lexeme, Lexeme.id == UserWord.lexeme_id)
+            .where(UserWord.user_id == user_id)
+            .limit(limit + 1)
+        )
+
+        if newer:
+            statement = (
+                statement
+                .where(tuple_(user_word_created_key, UserWord.id) > tuple_(*cursor))
+                .order_by(user_word_created_key, UserWord.id)
+            )
+
+        else:
+            if cursor is not None:
+                statement = statement.where(tuple_(user_word_created_key, UserWord.id) < tuple_(*cursor))
+
+            statement = statement.order_by(user_word_created_key.desc(), UserWord.id.desc())
+
+        result = await self.session.execute(statement)
+        words = result.all()
+        has_more = len(words) > limit
+        words = words[:limit]
+
+        if newer:
+            if not has_more:
+                # reached the newest words, the first page is shown full
+                return await self.get_words_page(user_id, limit=limit)
+
+            words.reverse()
+
+        page = WordsPage(words)
+        if words:
+            if newer or cursor is not None:
+                page.newer_cursor = (words[0].created_key, words[0].id)
+
+            if newer or has_more:
+                page.older_cursor = (words[-1].created_key, words[-1].id)
+
+        return page
+
+    async def add_word(self, user_id: int, word: str, language_id: int) -> int:
+        """
+        Save a word for the user through the write batcher. The lexeme is shared by all users
+        and created only if the language has no word with the same normalized form yet, saving
+        a word the user already has is a no-op. Both writes are submitted as one unit, so they
+        are committed in the same transaction, or fail together. The user's cached search
+        index is dropped.
+
+        :param user_id: ID of the user
+        :param word: the word to save
+        :param language_id: ID of the language of the word
+        :return: ID of the user's word, once it is committed
+        """
+        text = " ".join(word.split())
+        normalized = normalize_word(text)
+
+        lexeme_id, user_word_id = await asyncio.gather(*write_batcher.submit_unit([
+            (LEXEME_UPSERT, {'language_id': language_id, 'normalized': normalized, 'text': text}, True),
+            (USER_WORD_UPSERT, {'user_id': user_id, 'language_id': language_id, 'normalized': normalized}, True),
+        ]))
+
+        word_index.invalidate(user_id)
+        logger.debug(f"Saved word {user_word_id} (lexeme {lexeme_id}) for user {user_id}")
+        return user_word_id
+
+    async def search(self, user_id: int, query: str, mode: str = "prefix", language_id: Optional[int] = None,
+                     offset: int = 0, limit: int = 50) -> List[Row]:
+        """
+        Full-text search over the user's words, best matches (bm25) first
+
+        :param user_id: ID of the user
+        :param query: search query
+        :param mode: "prefix", "phrase" or "any", see build_match_expression
+        :param language_id: ID of the language to search in, all languages by default
+        :param offset: number of skipped matches
+        :param limit: maximal number of matches
+        :return: rows of (id, text, rank) with the ID of the user's word
+        """
+        match = build_match_expression(query, mode)
+        if match is None:
+            return []
+
+        statement = (
+            select(UserWord.id, Lexeme.text, lexemes_fts.c.rank)
+            .select_from(lexemes_fts)
+            .join(Lexeme, Lexeme.id == lexemes_fts.c.rowid)
+            .join(UserWord, and_(UserWord.lexeme_id == Lexeme.id, UserWord.user_id == user_id))
+            .where(literal_column("lexemes_fts").op("MATCH")(match))
+            .order_by(lexemes_fts.c.rank, Lexeme.text)
+            .offset(offset)
+            .limit(limit)
+        )
+
+        if language_id is not None:
+            statement = statement.where(Lexeme.language_id == language_id)
+
+        result = await self.session.execute(statement)
+        return result.all()
@@ -1,7 +1,8 @@
 from config import get_config
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 from .routers import init_routers
+from .common.middlewares import DeduplicationMiddleware, QueryScopeMiddleware, ThrottlingMiddleware
+from .common.storage import ExpiringMemoryStorage
 import logging
 
 # setting up logging
@@ -12,13 +13,36 @@ Config = get_config()
 
 # initial telegram parameters
 developer_bot = Bot(token=Config.TELEGRAM_BOT_TOKEN)
-storage = MemoryStorage()
+storage = ExpiringMemoryStorage(idle_ttl=Config.FSM_STATE_IDLE_TTL, max_entries=Config.FSM_STATE_MAX_ENTRIES)
 developer_dispatcher = Dispatcher(storage=storage)
 
+# dropping already processed updates before they reach any router
+update_deduplicator = DeduplicationMiddleware(
+    window_size=Config.UPDATE_DEDUP_WINDOW,
+    persist_every=Config.UPDATE_DEDUP_PERSIST_EVERY
+)
+developer_dispatcher.update.outer_middleware(update_deduplicator)
+developer_dispatcher.shutdown.register(update_deduplicator.close)
+
+# attributing the SQL statements to the update and the handler processing it
+query_scope_middleware = QueryScopeMiddleware()
+developer_dispatcher.update.outer_middleware(query_scope_middleware)
+for observer in (developer_dispatcher.message, developer_dispatcher.callback_query,
+                 developer_dispatcher.inline_query):
+    observer.middleware(query_scope_middleware)
+
+# flood protection, every update is charged once to the limit of the handler it reaches
+throttling_middleware = ThrottlingMiddleware.from_config()
+for observer in (developer_dispatcher.message, developer_dispatcher.callback_query,
+                 developer_dispatcher.inline_query):
+    observer.middleware(throttling_middleware)
+
 # initialize telegram bot
 async def initialize_telegram_bot():
     try:
         await init_routers(developer_bot, developer_dispatcher)
+        await update_deduplicator.restore(developer_bot)
+        storage.start_sweeper(Config.FSM_STATE_SWEEP_INTERVAL)
         logger.info("Telegram bot initialized")
 
         if Config.WEBHOOK_ENABLED:
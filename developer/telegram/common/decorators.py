@@ -3,6 +3,7 @@ from aiogram import types
 from developer.localization import i18n
 from developer.services.user_service import UserService
 from developer.database.session import db_manager
+from developer.telegram.common.message_tracker import message_tracker
 
 
 def with_localization(handler):
@@ -28,7 +29,7 @@ def with_localization(handler):
             user_id = message_or_callback.from_user.id
 
         # retrieving user language
-        async with db_manager.get_session() as session:
+        async with db_manager.get_read_session() as session:
             user_service = UserService(session)
             user_language = await user_service.get_user_language(user_id)
 
@@ -74,7 +75,7 @@ def with_localization_and_state(handler):
             user_id = message_or_callback.from_user.id
 
         # retrieving user language
-        async with db_manager.get_session() as session:
+        async with db_manager.get_read_session() as session:
             user_service = UserService(session)
             user_language = await user_service.get_user_language(user_id)
 
@@ -94,7 +95,17 @@ def with_localization_and_state(handler):
             def k(key: str, locale = 'en', **format_kwargs):
                 return i18n.get_keyboard(key, locale, **format_kwargs)
 
-        return await handler(message_or_callback, state, t, k, *args, **kwargs)
+        # the displayed messages of the chat are tracked across the steps of the flow
+        chat_id = message_or_callback.chat.id if isinstance(message_or_callback, types.Message) \
+            else message_or_callback.message.chat.id
+        await message_tracker.restore_from_state(state, chat_id)
+
+        result = await handler(message_or_callback, state, t, k, *args, **kwargs)
+
+        if await state.get_state() is not None:
+            await message_tracker.save_to_state(state, chat_id)
+
+        return result
 
     return wrapper
 
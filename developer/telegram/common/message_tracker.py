@@ -0,0 +1,269 @@
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Any, Dict, List, Optional, Tuple
+from aiogram import Bot, types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.fsm.context import FSMContext
+from config import get_config
+import logging
+
+Config = get_config()
+
+logger = logging.getLogger(__name__)
+
+# (text hash, markup hash) of a rendered message
+RenderedState = Tuple[Optional[str], Optional[str]]
+
+
+class DisplayedMessageTracker:
+    """
+    Keeps a bounded per-chat record of what the bot has rendered in each message,
+    so that edits which would not change anything are skipped locally instead of
+    costing a Bot API call and a "message is not modified" error.
+
+    Only short hashes of the text and of the reply markup are stored. Both the
+    number of chats and the number of messages per chat are capped, the least
+    recently used entries are dropped first.
+
+    :ivar max_chats: Maximum number of chats kept in memory.
+    :type max_chats: int
+    :ivar max_messages_per_chat: Maximum number of messages kept for a single chat.
+    :type max_messages_per_chat: int
+    """
+    STATE_KEY = "displayed_messages"
+
+    def __init__(self, max_chats: int = 10000, max_messages_per_chat: int = 20) -> None:
+        self.max_chats = max_chats
+        self.max_messages_per_chat = max_messages_per_chat
+        self._chats: "OrderedDict[int, OrderedDict[int, RenderedState]]" = OrderedDict()
+
+    # ========== HASHING ==========
+
+    @staticmethod
+    def _hash(value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+
+        return blake2b(value.encode("utf-8"), digest_size=8).hexdigest()
+
+    @classmethod
+    def hash_text(cls, text: Optional[str]) -> Optional[str]:
+        return cls._hash(text)
+
+    @classmethod
+    def hash_markup(cls, reply_markup: Optional[Any]) -> Optional[str]:
+        if reply_markup is None:
+            return None
+
+        # an empty inline keyboard is rendered the same way as no keyboard at all
+        if isinstance(reply_markup, types.InlineKeyboardMarkup) and not reply_markup.inline_keyboard:
+            return None
+
+        if hasattr(reply_markup, "model_dump_json"):
+            return cls._hash(reply_markup.model_dump_json(exclude_none=True))
+
+        return cls._hash(str(reply_markup))
+
+    # ========== RECORD MANAGEMENT ==========
+
+    def _get_chat(self, chat_id: int, create: bool = False) -> Optional["OrderedDict[int, RenderedState]"]:
+        chat = self._chats.get(chat_id)
+
+        if chat is None:
+            if not create:
+                return None
+
+            chat = OrderedDict()
+            self._chats[chat_id] = chat
+
+            # dropping the least recently used chats
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+
+        else:
+            self._chats.move_to_end(chat_id)
+
+        return chat
+
+    def remember(self, chat_id: int, message_id: int, text: Optional[str] = None,
+                 reply_markup: Optional[Any] = None) -> None:
+        self._remember_hashes(chat_id, message_id, (self.hash_text(text), self.hash_markup(reply_markup)))
+
+    def _remember_hashes(self, chat_id: int, message_id: int, rendered: RenderedState) -> None:
+        chat = self._get_chat(chat_id, create=True)
+        chat[message_id] = rendered
+        chat.move_to_end(message_id)
+
+        while len(chat) > self.max_messages_per_chat:
+            chat.popitem(last=False)
+
+    def remember_message(self, message: types.Message) -> None:
+        self.remember(message.chat.id, message.message_id, message.text or message.caption, message.reply_markup)
+
+    def get_rendered(self, chat_id: int, message_id: int) -> Optional[RenderedState]:
+        chat = self._get_chat(chat_id)
+        return chat.get(message_id) if chat else None
+
+    def forget(self, chat_id: int, message_id: int) -> None:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            return
+
+        chat.pop(message_id, None)
+        if not chat:
+            del self._chats[chat_id]
+
+    def forget_chat(self, chat_id: int) -> None:
+        self._chats.pop(chat_id, None)
+
+    def get_message_ids(self, chat_id: int) -> List[int]:
+        chat = self._chats.get(chat_id)
+        return list(chat.keys()) if chat else []
+
+    def _get_current_state(self, message: types.Message) -> RenderedState:
+        # the record is preferred, otherwise the message itself tells what the chat shows
+        rendered = self.get_rendered(message.chat.id, message.message_id)
+        if rendered is not None:
+            return rendered
+
+        return self.hash_text(message.text or message.caption), self.hash_markup(message.reply_markup)
+
+    # ========== BOT API WRAPPERS ==========
+
+    async def edit_reply_markup(self, message: types.Message, reply_markup: Optional[Any] = None) -> bool:
+        """
+        Edits the reply markup of a message unless it already shows the same markup.
+
+        :param message: The message to edit
+        :param reply_markup: The new reply markup, None removes the keyboard
+        :return: True if the Bot API was called, False if the edit was skipped
+        """
+        current_text, current_markup = self._get_current_state(message)
+        new_markup = self.hash_markup(reply_markup)
+
+        if current_markup == new_markup:
+            logger.debug(f"Skipping unchanged reply markup edit for message {message.message_id}")
+            return False
+
+        try:
+            await message.edit_reply_markup(reply_markup=reply_markup)
+
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                raise
+
+            logger.debug(f"Message {message.message_id} was not modified: {e}")
+
+        self._remember_hashes(message.chat.id, message.message_id, (current_text, new_markup))
+        return True
+
+    async def edit_text(self, message: types.Message, text: str, reply_markup: Optional[Any] = None,
+                        **kwargs) -> bool:
+        """
+        Edits the text (and the reply markup) of a message unless both are unchanged.
+
+        :param message: The message to edit
+        :param text: The new text
+        :param reply_markup: The new reply markup
+        :return: True if the Bot API was called, False if the edit was skipped
+        """
+        rendered = (self.hash_text(text), self.hash_markup(reply_markup))
+
+        if self._get_current_state(message) == rendered:
+            logger.debug(f"Skipping unchanged text edit for message {message.message_id}")
+            return False
+
+        try:
+            await message.edit_text(text=text, reply_markup=reply_markup, **kwargs)
+
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                raise
+
+            logger.debug(f"Message {message.message_id} was not modified: {e}")
+
+        self._remember_hashes(message.chat.id, message.message_id, rendered)
+        return True
+
+    async def send_message(self, bot: Bot, chat_id: int, text: str, reply_markup: Optional[Any] = None,
+                           **kwargs) -> types.Message:
+        sent_message = await bot.send_message(chat_id, text=text, reply_markup=reply_markup, **kwargs)
+        self.remember(chat_id, sent_message.message_id, text, reply_markup)
+        return sent_message
+
+    async def clear_keyboards(self, bot: Bot, chat_id: int) -> int:
+        """
+        Removes inline keyboards from every tracked message of the chat which still shows one.
+
+        :return: Number of edited messages
+        """
+        edited = 0
+        chat = self._chats.get(chat_id)
+        if not chat:
+            return edited
+
+        for message_id, (text_hash, markup_hash) in list(chat.items()):
+            if markup_hash is None:
+                continue
+
+            try:
+                await bot.edit_message_reply_markup(chat_id=chat_id, message_id=message_id, reply_markup=None)
+                edited += 1
+
+            except TelegramBadRequest as e:
+                logger.debug(f"Failed to clear keyboard of message {message_id}: {e}")
+
+            self._remember_hashes(chat_id, message_id, (text_hash, None))
+
+        return edited
+
+    async def delete_messages(self, bot: Bot, chat_id: int) -> int:
+        """
+        Deletes every tracked message of the chat and forgets the chat afterward.
+
+        :return: Number of deleted messages
+        """
+        message_ids = self.get_message_ids(chat_id)
+        self.forget_chat(chat_id)
+
+        if not message_ids:
+            return 0
+
+        try:
+            await bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+            return len(message_ids)
+
+        except TelegramBadRequest as e:
+            logger.debug(f"Failed to delete tracked messages in chat {chat_id}: {e}")
+            return 0
+
+    # ========== FSM PERSISTENCE ==========
+
+    def dump(self, chat_id: int) -> Dict[str, List[Optional[str]]]:
+        chat = self._chats.get(chat_id)
+        if not chat:
+            return {}
+
+        return {str(message_id): list(rendered) for message_id, rendered in chat.items()}
+
+    def load(self, chat_id: int, data: Dict[str, List[Optional[str]]]) -> None:
+        for message_id, rendered in data.items():
+            self._remember_hashes(chat_id, int(message_id), (rendered[0], rendered[1]))
+
+    async def save_to_state(self, state: FSMContext, chat_id: int) -> None:
+        await state.update_data({self.STATE_KEY: self.dump(chat_id)})
+
+    async def restore_from_state(self, state: FSMContext, chat_id: int) -> None:
+        if chat_id in self._chats:
+            return
+
+        data = await state.get_value(self.STATE_KEY)
+        if data:
+            self.load(chat_id, data)
+
+
+# creating global tracker
+message_tracker = DisplayedMessageTracker(
+    max_chats=Config.MESSAGE_TRACKER_MAX_CHATS,
+    max_messages_per_chat=Config.MESSAGE_TRACKER_MAX_MESSAGES_PER_CHAT
+)
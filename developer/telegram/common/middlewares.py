@@ -0,0 +1,376 @@
+import asyncio
+import base64
+import json
+from array import array
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from aiogram import BaseMiddleware, Bot
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import TelegramObject, Update
+from sqlalchemy import select, func
+from sqlalchemy.dialects.sqlite import insert
+from developer.database.models import DeduplicationWindow
+from developer.database.session import db_manager
+from developer.database.batching import write_batcher
+from developer.database.instrumentation import query_instrumentation, current_query_scope
+from config import get_config
+import logging
+
+Config = get_config()
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketLimiter:
+    """
+    Per-user token buckets kept in two flat float arrays indexed by a slot number.
+
+    A user takes a slot on the first request and releases it after staying idle
+    for ``idle_ttl`` seconds, freed slots are reused by the next new users, so the
+    memory is proportional to the number of recently active users only.
+
+    :ivar rate: Number of tokens refilled per second.
+    :type rate: float
+    :ivar burst: Bucket capacity, i.e. the number of requests allowed in a row.
+    :type burst: float
+    :ivar idle_ttl: Seconds of inactivity after which a bucket is evicted.
+    :type idle_ttl: float
+    """
+    def __init__(self, rate: float, burst: float, idle_ttl: float = 600.0) -> None:
+        self.rate = rate
+        self.burst = burst
+        # a bucket idle for longer than it takes to refill is full anyway
+        self.idle_ttl = max(idle_ttl, burst / rate)
+
+        self._slots: Dict[int, int] = {}
+        self._free_slots: List[int] = []
+        self._tokens = array('d')
+        self._updated_at = array('d')
+        self._next_eviction = monotonic() + self.idle_ttl
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _get_slot(self, user_id: int, now: float) -> int:
+        slot = self._slots.get(user_id)
+        if slot is not None:
+            return slot
+
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._tokens[slot] = self.burst
+            self._updated_at[slot] = now
+
+        else:
+            slot = len(self._tokens)
+            self._tokens.append(self.burst)
+            self._updated_at.append(now)
+
+        self._slots[user_id] = slot
+        return slot
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        if now is None:
+            now = monotonic()
+
+        idle_users = [user_id for user_id, slot in self._slots.items()
+                      if now - self._updated_at[slot] > self.idle_ttl]
+
+        for user_id in idle_users:
+            self._free_slots.append(self._slots.pop(user_id))
+
+        self._next_eviction = now + self.idle_ttl
+        return len(idle_users)
+
+    def acquire(self, user_id: int, max_delay: float = 0.0) -> Optional[float]:
+        """
+        Takes a token from the user's bucket.
+
+        :param user_id: Telegram id of the user
+        :param max_delay: Longest acceptable wait for a token, in seconds
+        :return: 0.0 if the token is available right away, the delay to wait before
+            processing if the token is reserved in advance, or None if the request
+            has to be dropped
+        """
+        now = monotonic()
+        if now >= self._next_eviction:
+            self.evict_idle(now)
+
+        slot = self._get_slot(user_id, now)
+        tokens = min(self.burst, self._tokens[slot] + (now - self._updated_at[slot]) * self.rate)
+        self._updated_at[slot] = now
+
+        if tokens >= 1.0:
+            self._tokens[slot] = tokens - 1.0
+            return 0.0
+
+        delay = (1.0 - tokens) / self.rate
+        if delay > max_delay:
+            self._tokens[slot] = tokens
+            return None
+
+        # reserving the token, the bucket goes below zero until the delay passes
+        self._tokens[slot] = tokens - 1.0
+        return delay
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Inner middleware dropping or deferring updates of users who exceed the rate limit
+    of the resolved handler, before the handler does any database or localization work.
+
+    The limit is the ``throttling`` flag of the handler, e.g. ``flags={'throttling': 'ai'}``,
+    otherwise the profile named after the router of the handler. Every profile of the
+    limits has buckets of its own and every update is charged once, to the profile of
+    the handler it reaches.
+    """
+    def __init__(self, limits: Dict[str, Tuple[float, float, float]], idle_ttl: float = 600.0) -> None:
+        self.limiters = {
+            profile: (TokenBucketLimiter(rate, burst, idle_ttl), max_delay)
+            for profile, (rate, burst, max_delay) in limits.items()
+        }
+
+    @classmethod
+    def from_config(cls) -> "ThrottlingMiddleware":
+        return cls(Config.THROTTLING_LIMITS, Config.THROTTLING_IDLE_TTL)
+
+    def get_profile(self, data: Dict[str, Any]) -> str:
+        profile = get_flag(data, 'throttling')
+        if profile is None:
+            router = data.get('event_router')
+            profile = router.name if router is not None else None
+
+        return profile if profile in self.limiters else 'default'
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        user = data.get('event_from_user')
+        if user is None:
+            return await handler(event, data)
+
+        profile = self.get_profile(data)
+        limiter, max_delay = self.limiters[profile]
+        delay = limiter.acquire(user.id, max_delay)
+
+        if delay is None:
+            logger.debug(f"Dropping {type(event).__name__} from user {user.id} throttled by the '{profile}' limit")
+            return None
+
+        if delay:
+            logger.debug(f"Deferring {type(event).__name__} from user {user.id} for {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+        return await handler(event, data)
+
+
+class UpdateWindow:
+    """
+    Sliding window over the most recent ``size`` update ids stored as a ring bitmap.
+
+    Telegram update ids grow monotonically, so everything older than the window is
+    considered to be already processed. Checking and marking an id are O(1).
+
+    Telegram starts the ids over from a random number when the bot gets no updates for
+    a week, so an id further than the window behind the highest one is taken as such a
+    reset and starts a new window instead of being dropped.
+
+    :ivar size: Number of update ids covered by the window, a multiple of 8.
+    :type size: int
+    :ivar highest: The highest update id seen so far.
+    :type highest: Optional[int]
+    """
+    def __init__(self, size: int = 4096) -> None:
+        self.size = size - size % 8
+        self.highest: Optional[int] = None
+        self._bitmap = bytearray(self.size // 8)
+
+    def _get_bit(self, update_id: int) -> bool:
+        position = update_id % self.size
+        return bool(self._bitmap[position >> 3] & (1 << (position & 7)))
+
+    def _set_bit(self, update_id: int, value: bool) -> None:
+        position = update_id % self.size
+        if value:
+            self._bitmap[position >> 3] |= 1 << (position & 7)
+        else:
+            self._bitmap[position >> 3] &= ~(1 << (position & 7)) & 0xFF
+
+    def _advance(self, update_id: int) -> None:
+        if self.highest is None or abs(update_id - self.highest) >= self.size:
+            self._bitmap = bytearray(self.size // 8)
+
+        else:
+            for skipped_id in range(self.highest + 1, update_id + 1):
+                self._set_bit(skipped_id, False)
+
+        self.highest = update_id
+
+    def mark(self, update_id: int) -> bool:
+        """
+        Marks the update id as processed.
+
+        :return: True if the id is new, False if it was seen before
+        """
+        if self.highest is not None and update_id <= self.highest - self.size:
+            logger.warning(f"Update id {update_id} is far behind {self.highest}, "
+                           f"the update ids were reset, starting a new window")
+            self._advance(update_id)
+
+        elif self.highest is None or update_id > self.highest:
+            self._advance(update_id)
+
+        elif self._get_bit(update_id):
+            return False
+
+        self._set_bit(update_id, True)
+        return True
+
+    def unmark(self, update_id: int) -> None:
+        if self.highest is not None and self.highest - self.size < update_id <= self.highest:
+            self._set_bit(update_id, False)
+
+    def dump(self) -> Dict[str, Any]:
+        return {
+            'size': self.size,
+            'highest': self.highest,
+            'bitmap': base64.b64encode(bytes(self._bitmap)).decode('ascii'),
+        }
+
+    def load(self, data: Dict[str, Any]) -> None:
+        if not data or data.get('size') != self.size:
+            return
+
+        self.highest = data.get('highest')
+        self._bitmap = bytearray(base64.b64decode(data['bitmap']))
+
+
+# the saves of concurrent updates are sent by the write batcher in one commit
+_window_upsert = insert(DeduplicationWindow)
+DEDUPLICATION_WINDOW_UPSERT = _window_upsert.on_conflict_do_update(
+    index_elements=[DeduplicationWindow.bot_id],
+    set_={'data': _window_upsert.excluded.data, 'updated_at': func.now()}
+)
+
+
+class DeduplicationMiddleware(BaseMiddleware):
+    """
+    Outer update middleware dropping updates which were already processed, e.g. webhook
+    retries or updates delivered again after a crash-restart.
+
+    The window is saved to the ``deduplication_windows`` table every ``persist_every``
+    new updates, after a failed update is unmarked and on shutdown, and restored on
+    startup. The saves run in a background task, at most one at a time, so the updates
+    never wait for the commit. The updates marked since the last save may be processed
+    again after a crash.
+    """
+    def __init__(self, window_size: int = 4096, persist_every: int = 1) -> None:
+        self.window = UpdateWindow(window_size)
+        self.persist_every = persist_every
+        self._bot_id: Optional[int] = None
+        self._unsaved = 0
+        self._save_pending = False
+        self._save_task: Optional[asyncio.Task] = None
+
+    async def restore(self, bot: Bot) -> None:
+        self._bot_id = bot.id
+
+        async with db_manager.get_read_session() as session:
+            result = await session.execute(
+                select(DeduplicationWindow.data).where(DeduplicationWindow.bot_id == self._bot_id)
+            )
+            data = result.scalar()
+
+        if data is not None:
+            self.window.load(json.loads(data))
+
+        logger.debug(f"Update deduplication window restored, highest update id: {self.window.highest}")
+
+    async def save(self) -> None:
+        if self._bot_id is None:
+            return
+
+        self._unsaved = 0
+        await write_batcher.submit(
+            DEDUPLICATION_WINDOW_UPSERT,
+            {'bot_id': self._bot_id, 'data': json.dumps(self.window.dump())}
+        )
+
+    def _schedule_save(self) -> None:
+        self._save_pending = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._run_saves())
+
+    async def _run_saves(self) -> None:
+        # the changes made during a save are written by the next one
+        while self._save_pending:
+            self._save_pending = False
+            try:
+                await self.save()
+
+            except Exception as e:
+                logger.error(f"Error saving the update deduplication window: {e}")
+                return
+
+    async def close(self) -> None:
+        if self._save_task is not None:
+            await self._save_task
+            self._save_task = None
+
+        await self.save()
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+
+        if not self.window.mark(event.update_id):
+            logger.info(f"Dropping duplicate update {event.update_id}")
+            return None
+
+        self._unsaved += 1
+        if self._unsaved >= self.persist_every:
+            self._schedule_save()
+
+        try:
+            return await handler(event, data)
+
+        except Exception:
+            # letting Telegram redeliver the update which failed
+            self.window.unmark(event.update_id)
+            self._schedule_save()
+            raise
+
+
+class QueryScopeMiddleware(BaseMiddleware):
+    """
+    Attributes the SQL statements to the update they are executed for.
+
+    As an outer update middleware it opens a query scope per update, as an inner
+    middleware of the event observers it names the scope after the handler which
+    was resolved for the event.
+    """
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        if isinstance(event, Update):
+            with query_instrumentation.scope(f"update {event.update_id} {event.event_type}",
+                                             label=f"unhandled {event.event_type}"):
+                return await handler(event, data)
+
+        scope = current_query_scope.get()
+        handler_object = data.get('handler')
+        if scope is not None and handler_object is not None:
+            scope.handler = handler_object.callback.__name__
+
+        return await handler(event, data)
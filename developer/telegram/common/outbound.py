@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from config import get_config
+import asyncio
+import logging
+
+Config = get_config()
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutboundMessage:
+    chat_id: int
+    text: str
+    reply_markup: Optional[Any] = None
+
+
+class OutboundSender:
+    """
+    Queue of the messages sent outside of the update handling, e.g. notifications of the
+    scheduled jobs. A single worker sends them at most ``rate`` messages per second and
+    waits out the flood control of the Bot API, so a burst of notifications does not
+    throttle the replies to the users.
+
+    :ivar rate: Maximal number of messages sent per second.
+    :type rate: float
+    :ivar max_queue_size: Number of queued messages after which new ones are dropped.
+    :type max_queue_size: int
+    """
+    def __init__(self, rate: float = 25.0, max_queue_size: int = 10000) -> None:
+        self.rate = rate
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue[OutboundMessage]] = None
+        self._worker_task: Optional[asyncio.Task] = None
+
+        # metrics
+        self.sent = 0
+        self.dropped = 0
+
+    def send(self, chat_id: int, text: str, reply_markup: Optional[Any] = None) -> bool:
+        """
+        Queue a message
+
+        :param chat_id: ID of the chat
+        :param text: text of the message
+        :param reply_markup: keyboard of the message
+        :return: False if the queue is full and the message was dropped
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+
+        try:
+            self._queue.put_nowait(OutboundMessage(chat_id, text, reply_markup))
+            return True
+
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Outbound queue is full, dropping the message to chat {chat_id}")
+            return False
+
+    async def _deliver(self, bot: Bot, message: OutboundMessage) -> None:
+        while True:
+            try:
+                await bot.send_message(message.chat_id, text=message.text, reply_markup=message.reply_markup)
+                self.sent += 1
+                return
+
+            except TelegramRetryAfter as e:
+                logger.warning(f"Outbound messages are flood limited for {e.retry_after} seconds")
+                await asyncio.sleep(e.retry_after)
+
+            except TelegramForbiddenError:
+                logger.debug(f"Chat {message.chat_id} blocked the bot, the message is dropped")
+                return
+
+    async def _run_worker(self, bot: Bot) -> None:
+        while True:
+            message = await self._queue.get()
+
+            try:
+                await self._deliver(bot, message)
+
+            except Exception as e:
+                logger.error(f"Error sending the message to chat {message.chat_id}: {e}")
+
+            finally:
+                self._queue.task_done()
+
+            await asyncio.sleep(1 / self.rate)
+
+    def start(self, bot: Bot) -> None:
+        if self._worker_task is not None:
+            logger.warning("Outbound sender already started")
+            return
+
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+
+        self._worker_task = asyncio.create_task(self._run_worker(bot))
+        logger.info("Outbound sender started")
+
+    async def stop(self) -> None:
+        if self._worker_task is None:
+            return
+
+        # the messages still queued are lost
+        self._worker_task.cancel()
+        try:
+            await self._worker_task
+
+        except asyncio.CancelledError:
+            pass
+
+        self._worker_task = None
+        logger.info(f"Outbound sender stopped, {self.sent} sent, {self.dropped} dropped")
+
+
+# creating global outbound sender
+outbound_sender = OutboundSender(rate=Config.OUTBOUND_MESSAGES_PER_SECOND, max_queue_size=Config.OUTBOUND_QUEUE_SIZE)
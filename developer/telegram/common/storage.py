@@ -0,0 +1,152 @@
+import asyncio
+from collections import OrderedDict
+from copy import copy
+from time import monotonic
+from typing import Any, Dict, Optional
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import DEFAULT_DESTINY, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage, MemoryStorageRecord
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiringMemoryStorage(MemoryStorage):
+    """
+    Memory FSM storage whose entries expire after staying untouched for ``idle_ttl``
+    seconds, e.g. abandoned registrations, with a hard cap on the number of entries.
+
+    Entries are kept in the order they were last touched, so the background sweeper
+    only looks at the expired head of the queue and the cap evicts the oldest ones.
+    Entries stored under a non-default destiny (service data such as the update
+    deduplication window) never expire.
+
+    :ivar idle_ttl: Seconds of inactivity after which an entry expires.
+    :type idle_ttl: float
+    :ivar max_entries: Maximum number of expiring entries kept in memory.
+    :type max_entries: int
+    """
+    def __init__(self, idle_ttl: float = 86400.0, max_entries: int = 100000) -> None:
+        super().__init__()
+        self.idle_ttl = idle_ttl
+        self.max_entries = max_entries
+
+        self._touched_at: "OrderedDict[StorageKey, float]" = OrderedDict()
+        self._sweeper_task: Optional[asyncio.Task] = None
+
+        # metrics
+        self.expired_total = 0
+        self.evicted_total = 0
+        self.last_sweep_expired = 0
+
+    # ========== ENTRIES TRACKING ==========
+
+    def _touch(self, key: StorageKey) -> None:
+        if key.destiny != DEFAULT_DESTINY:
+            return
+
+        record = self.storage.get(key)
+        if record is not None and record.state is None and not record.data:
+            # an empty record is the same as no record at all
+            self._drop(key)
+            return
+
+        self._touched_at[key] = monotonic()
+        self._touched_at.move_to_end(key)
+
+        while len(self._touched_at) > self.max_entries:
+            oldest_key, _ = self._touched_at.popitem(last=False)
+            self.storage.pop(oldest_key, None)
+            self.evicted_total += 1
+
+    def _drop(self, key: StorageKey) -> None:
+        self.storage.pop(key, None)
+        self._touched_at.pop(key, None)
+
+    def sweep(self) -> int:
+        """
+        Removes every entry which has not been touched for ``idle_ttl`` seconds.
+
+        :return: Number of expired entries
+        """
+        expired = 0
+        deadline = monotonic() - self.idle_ttl
+
+        while self._touched_at:
+            key, touched_at = next(iter(self._touched_at.items()))
+            if touched_at > deadline:
+                break
+
+            self._drop(key)
+            expired += 1
+
+        self.expired_total += expired
+        self.last_sweep_expired = expired
+        return expired
+
+    def get_metrics(self) -> Dict[str, int]:
+        return {
+            'entries': len(self._touched_at),
+            'expired_total': self.expired_total,
+            'evicted_total': self.evicted_total,
+            'last_sweep_expired': self.last_sweep_expired,
+        }
+
+    # ========== BACKGROUND SWEEPER ==========
+
+    def start_sweeper(self, interval: float = 60.0) -> None:
+        if self._sweeper_task is not None and not self._sweeper_task.done():
+            logger.warning("FSM storage sweeper already started")
+            return
+
+        self._sweeper_task = asyncio.create_task(self._run_sweeper(interval))
+
+    async def _run_sweeper(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+
+            try:
+                expired = self.sweep()
+                if expired:
+                    logger.info(f"Expired {expired} idle FSM states, metrics: {self.get_metrics()}")
+
+            except Exception as e:
+                logger.error(f"Error sweeping FSM storage: {e}")
+
+    async def close(self) -> None:
+        if self._sweeper_task is not None:
+            self._sweeper_task.cancel()
+            self._sweeper_task = None
+
+        await super().close()
+
+    # ========== STORAGE INTERFACE ==========
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self.storage[key].state = state.state if isinstance(state, State) else state
+        self._touch(key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        # reading never creates a record, unlike the defaultdict of the parent storage
+        record = self.storage.get(key)
+        if record is None:
+            return None
+
+        self._touch(key)
+        return record.state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        self.storage[key].data = data.copy()
+        self._touch(key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = self.storage.get(key)
+        if record is None:
+            return {}
+
+        self._touch(key)
+        return record.data.copy()
+
+    async def get_value(self, storage_key: StorageKey, dict_key: str, default: Optional[Any] = None) -> Optional[Any]:
+        record = self.storage.get(storage_key, MemoryStorageRecord())
+        return copy(record.data.get(dict_key, default))
@@ -1,9 +1,10 @@
 import asyncio
 from aiogram import types, Router, Bot
 from aiogram.filters import Command
-from aiogram.types import ReplyKeyboardRemove
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardRemove
 from developer.telegram.common.decorators import with_localization
-from developer.services import UserService
+from developer.telegram.common.message_tracker import message_tracker
+from developer.services import UserService, account_eraser
 from developer.database.session import db_manager
 import logging
 
@@ -15,9 +16,9 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
     @with_localization
     async def start_command(message: types.Message, t, k):
         # looking up for the current user
-        async with db_manager.get_session() as session:
+        async with db_manager.get_read_session() as session:
             user_service = UserService(session)
-            current_user = await user_service.get_user_by_telegram_id(message.from_user.id)
+            current_user = await user_service.get_user_registration_status(message.from_user.id)
             logger.debug(f"Current user: {current_user}")
 
         # user not registered
@@ -34,6 +35,64 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
             )
 
 
+    # erasure of the account with all the user's data, done by the background account eraser
+    @router.message(Command(commands=['delete_account']))
+    @with_localization
+    async def delete_account_command(message: types.Message, t, k):
+        async with db_manager.get_read_session() as session:
+            user_service = UserService(session)
+            current_user = await user_service.get_user_admin_status(message.from_user.id)
+
+        if not current_user:
+            await message.answer(t('messages.not_registered'), parse_mode='MarkdownV2')
+            return
+
+        if account_eraser.is_scheduled(current_user.id):
+            await message.answer(t('messages.account_erasure.scheduled'))
+            return
+
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[[
+            InlineKeyboardButton(text=t('buttons.account_erasure.confirm'), callback_data="account-erasure_confirm"),
+            InlineKeyboardButton(text=t('buttons.account_erasure.cancel'), callback_data="account-erasure_cancel"),
+        ]])
+
+        await message_tracker.send_message(
+            bot,
+            message.chat.id,
+            text=t('messages.account_erasure.confirmation'),
+            reply_markup=keyboard
+        )
+
+    @router.callback_query(lambda c: c.data.startswith("account-erasure_"))
+    @with_localization
+    async def delete_account_confirmation(callback_query: types.CallbackQuery, t, k):
+        # answering the callback query
+        await bot.answer_callback_query(callback_query.id)
+
+        if callback_query.data.split("_")[1] != "confirm":
+            await message_tracker.edit_text(callback_query.message, t('messages.account_erasure.cancelled'))
+            return
+
+        async with db_manager.get_read_session() as session:
+            user_service = UserService(session)
+            current_user = await user_service.get_user_admin_status(callback_query.from_user.id)
+
+        if not current_user:
+            await message_tracker.edit_reply_markup(callback_query.message, reply_markup=None)
+            return
+
+        # the texts are resolved now, the user's language is erased together with the account
+        finished_text = t('messages.account_erasure.finished')
+        chat_id = callback_query.message.chat.id
+
+        async def notify_erased() -> None:
+            # the messages shown to the erased user are removed as well
+            await message_tracker.delete_messages(bot, chat_id)
+            await bot.send_message(chat_id, finished_text)
+
+        await account_eraser.schedule(current_user.id, on_erased=notify_erased)
+        await message_tracker.edit_text(callback_query.message, t('messages.account_erasure.scheduled'))
+
     @router.message(Command(commands=['test1']))
     @with_localization
     async def test1_command(message: types.Message, t, k):
@@ -105,9 +164,9 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
             :raises asyncio.CancelledError: If the asynchronous operation is canceled
                 during execution.
             """
-            async with db_manager.get_session() as session:
+            async with db_manager.get_read_session() as session:
                 user_service = UserService(session)
-                current_user = await user_service.get_user_by_telegram_id(message.from_user.id)
+                current_user = await user_service.get_user_registration_status(message.from_user.id)
                 logger.debug(f"Current user: {current_user}")
 
             if current_user:
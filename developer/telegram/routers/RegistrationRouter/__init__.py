@@ -6,7 +6,8 @@ logger = logging.getLogger(__name__)
 
 async def init_registration_router(bot: Bot) -> Router:
     try:
-        router = Router()
+        # the router name selects the throttling limit of its handlers
+        router = Router(name='registration')
         await setup_handlers(router, bot)
         return router
 
@@ -4,9 +4,11 @@ from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemo
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from developer.telegram.common.decorators import with_localization, with_localization_and_state
-from developer.services import UserService, LanguageService, UserAgreementService, PrivacyPolicyService
+from developer.services import UserService, UserAgreementService, PrivacyPolicyService
+from developer.services import language_catalog_manager
 from developer.database.session import db_manager
 from developer.telegram.common.validators import Validator
+from developer.telegram.common.message_tracker import message_tracker
 from config import get_config
 import logging
 
@@ -40,7 +42,7 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
         await bot.answer_callback_query(callback_query.id)
 
         # deleting the keyboard
-        await callback_query.message.edit_reply_markup(reply_markup=None)
+        await message_tracker.edit_reply_markup(callback_query.message, reply_markup=None)
 
         # creating a user_data dicitonary for the user
         user_data = {
@@ -53,16 +55,15 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
         # getting locale
         current_locale = callback_query.from_user.language_code
 
-        # getting keyboard context
-        async with db_manager.get_session() as session:
-            language_service = LanguageService(session)
-            interface_languages = await language_service.get_interface_languages()
+        # getting keyboard context from the in-memory language catalog
+        language_catalog = language_catalog_manager.catalog
 
         ### creating language buttons out of interface_languages
         language_buttons = {}
-        for interface_language in interface_languages:
+        for interface_language in language_catalog.interface_languages:
+            language_name = language_catalog.get_name(interface_language.code, interface_language.code)
             language_button = {
-                interface_language.code: {'label': f'{interface_language.flag_code} {interface_language.get_name(interface_language.code)}'}
+                interface_language.code: {'label': f'{interface_language.flag_code} {language_name}'}
             }
             language_buttons.update(language_button)
 
@@ -73,7 +74,8 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
         }
 
         # sending the language selection message
-        await bot.send_message(
+        await message_tracker.send_message(
+            bot,
             callback_query.from_user.id,
             text=t('messages.registration.language_select', locale=current_locale),
             reply_markup=k('generate_language_selection_keyboard', locale=current_locale, context=keyboard_context),
@@ -102,7 +104,7 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
         await bot.answer_callback_query(callback_query.id)
 
         # deleting the keyboard
-        await callback_query.message.edit_reply_markup(reply_markup=None)
+        await message_tracker.edit_reply_markup(callback_query.message, reply_markup=None)
 
         # preparing the terms control
         terms_control = {
@@ -114,7 +116,7 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
         await state.update_data(terms_control=terms_control)
 
         # fetching active user_agreement and privacy_policy
-        async with db_manager.get_session() as session:
+        async with db_manager.get_read_session() as session:
             user_agreement_service = UserAgreementService(session)
             privacy_policy_service = PrivacyPolicyService(session)
             active_user_agreement = await user_agreement_service.get_active_agreement(new_user_data["language_code"])
@@ -127,7 +129,8 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
         await state.update_data(user_data=new_user_data)
 
         # sending the terms of service message
-        await bot.send_message(
+        await message_tracker.send_message(
+            bot,
             callback_query.from_user.id,
             text=t('messages.registration.terms_of_service',
                    eula_url=active_user_agreement.url,
@@ -165,12 +168,14 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
 
             # refreshing the keyboard
             if not terms_control['privacy']:
-                await callback_query.message.edit_reply_markup(
+                await message_tracker.edit_reply_markup(
+                    callback_query.message,
                     reply_markup=k('keyboards.terms_of_service.eula_true_privacy_false',
                                    locale=user_data["language_code"]))
 
             elif terms_control['privacy']:
-                await callback_query.message.edit_reply_markup(
+                await message_tracker.edit_reply_markup(
+                    callback_query.message,
                     reply_markup=k('keyboards.terms_of_service.eula_true_privacy_true',
                                    locale=user_data["language_code"]))
 
@@ -185,12 +190,14 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
 
             # refreshing the keyboard
             if terms_control['eula']:
-                await callback_query.message.edit_reply_markup(
+                await message_tracker.edit_reply_markup(
+                    callback_query.message,
                     reply_markup=k('keyboards.terms_of_service.eula_true_privacy_true',
                                    locale=user_data["language_code"]))
 
             elif not terms_control['eula']:
-                await callback_query.message.edit_reply_markup(
+                await message_tracker.edit_reply_markup(
+                    callback_query.message,
                     reply_markup=k('keyboards.terms_of_service.eula_false_privacy_true',
                                    locale=user_data["language_code"]))
 
@@ -205,12 +212,14 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
 
             # refreshing the keyboard
             if terms_control['privacy']:
-                await callback_query.message.edit_reply_markup(
+                await message_tracker.edit_reply_markup(
+                    callback_query.message,
                     reply_markup=k('keyboards.terms_of_service.eula_false_privacy_true',
                                    locale=user_data["language_code"]))
 
             elif not terms_control['privacy']:
-                await callback_query.message.edit_reply_markup(
+                await message_tracker.edit_reply_markup(
+                    callback_query.message,
                     reply_markup=k('keyboards.terms_of_service.eula_false_privacy_false',
                                    locale=user_data["language_code"]))
 
@@ -225,12 +234,14 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
 
             # refreshing the keyboard
             if terms_control['eula']:
-                await callback_query.message.edit_reply_markup(
+                await message_tracker.edit_reply_markup(
+                    callback_query.message,
                     reply_markup=k('keyboards.terms_of_service.eula_true_privacy_false',
                                    locale=user_data["language_code"]))
 
             elif not terms_control['eula']:
-                await callback_query.message.edit_reply_markup(
+                await message_tracker.edit_reply_markup(
+                    callback_query.message,
                     reply_markup=k('keyboards.terms_of_service.eula_false_privacy_false',
                                    locale=user_data["language_code"]))
 
@@ -246,17 +257,18 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
             new_state_data = {**cleared_state_data, "user_data": new_user_data}
             await state.set_data(new_state_data)
 
-            # deleting the keyboard
-            await callback_query.message.edit_reply_markup(reply_markup=None)
+            # deleting the keyboard, and the keyboards of the previous steps still shown
+            await message_tracker.edit_reply_markup(callback_query.message, reply_markup=None)
+            await message_tracker.clear_keyboards(bot, callback_query.message.chat.id)
 
             # switching state
             await state.set_state(RegistrationState.GetUsername)
 
             # sending the username request message
-            await bot.send_message(callback_query.from_user.id,
-                                   text=t('messages.registration.username_request', locale=new_user_data["language_code"]),
-                                   parse_mode="MarkdownV2"
-                                   )
+            await message_tracker.send_message(bot, callback_query.from_user.id,
+                                               text=t('messages.registration.username_request', locale=new_user_data["language_code"]),
+                                               parse_mode="MarkdownV2"
+                                               )
         else:
             logger.error("Unknown terms confirmation")
 
@@ -306,8 +318,9 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
         # answering the callback query
         await bot.answer_callback_query(callback_query.id)
 
-        # deleting the keyboard
-        await callback_query.message.edit_reply_markup(reply_markup=None)
+        # deleting the keyboard, and the keyboards of the previous steps still shown
+        await message_tracker.edit_reply_markup(callback_query.message, reply_markup=None)
+        await message_tracker.clear_keyboards(bot, callback_query.message.chat.id)
 
         # getting timezone_receiving_method from the callback query
         timezone = callback_query.data.split("_")[1]
@@ -334,7 +347,8 @@ async def setup_handlers(router: Router, bot: Bot) -> None:
             )
 
             # sending the request location message
-            await bot.send_message(
+            await message_tracker.send_message(
+                bot,
                 callback_query.from_user.id,
                 text=t('messages.registration.get_users_timezone.share_location', locale=user_data["language_code"]),
                 reply_markup=request_location_keyboard,
@@ -0,0 +1,16 @@
+from aiogram import Router, Bot
+from .handlers import setup_handlers
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def init_vocabulary_router(bot: Bot) -> Router:
+    try:
+        # the router name selects the throttling limit of its handlers
+        router = Router(name='vocabulary')
+        await setup_handlers(router, bot)
+        return router
+
+    except Exception as e:
+        logger.error(f"Error initializing the Vocabulary router: {e}")
+        raise
@@ -0,0 +1,230 @@
+from aiogram import types, Router, Bot, F
+from aiogram.filters import Command, CommandObject
+from aiogram.types import (FSInputFile, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle,
+                           InputTextMessageContent)
+from developer.telegram.common.decorators import with_localization
+from developer.telegram.common.message_tracker import message_tracker
+from developer.services import UserService, WordService, WordImportService, ExportService
+from developer.services.word_service import WordsPage
+from developer.services.word_index import word_index
+from developer.database.session import db_manager
+from config import get_config
+from time import monotonic
+from typing import Optional
+import os
+import tempfile
+import logging
+
+Config = get_config()
+
+logger = logging.getLogger(__name__)
+
+
+def generate_words_page_keyboard(page: WordsPage) -> Optional[InlineKeyboardMarkup]:
+    """
+    Navigation buttons of a page of saved words, the cursor of the neighbouring page is
+    encoded in the callback data as "words-page_<n|o>_<created_at>_<id>" (well under 64 bytes)
+
+    :param page: the shown page
+    :return: the keyboard or None if there is a single page
+    """
+    buttons = []
+
+    if page.newer_cursor is not None:
+        created_key, word_id = page.newer_cursor
+        buttons.append(InlineKeyboardButton(text="◀", callback_data=f"words-page_n_{created_key}_{word_id}"))
+
+    if page.older_cursor is not None:
+        created_key, word_id = page.older_cursor
+        buttons.append(InlineKeyboardButton(text="▶", callback_data=f"words-page_o_{created_key}_{word_id}"))
+
+    return InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+
+
+def render_words_page(page: WordsPage, t) -> str:
+    if not page.words:
+        return t('messages.words.empty')
+
+    return "\n".join([t('messages.words.title')] + [f"• {word.text}" for word in page.words])
+
+
+async def setup_handlers(router: Router, bot: Bot) -> None:
+
+    # inline search over the user's saved words, answered from the in-memory index
+    @router.inline_query()
+    async def vocabulary_search(inline_query: types.InlineQuery):
+        page_size = Config.INLINE_RESULTS_PER_PAGE
+
+        try:
+            offset = int(inline_query.offset) if inline_query.offset else 0
+
+        except ValueError:
+            offset = 0
+
+        # requesting one extra word to find out whether there is a next page
+        words = await word_index.search(inline_query.from_user.id, inline_query.query, offset, page_size + 1)
+
+        results = [
+            InlineQueryResultArticle(
+                id=str(word_id),
+                title=word,
+                input_message_content=InputTextMessageContent(message_text=word)
+            )
+            for word_id, word in words[:page_size]
+        ]
+
+        await inline_query.answer(
+            results,
+            cache_time=Config.INLINE_CACHE_TIME,
+            is_personal=True,
+            next_offset=str(offset + page_size) if len(words) > page_size else ''
+        )
+
+    # users whose import is running, a user imports one file at a time
+    importing_users = set()
+
+    # import of words from a CSV, TSV or Anki text export sent as a document
+    @router.message(F.document.file_name.regexp(r'(?i).+\.(csv|tsv|txt)$'))
+    @with_localization
+    async def import_words(message: types.Message, t, k):
+        document = message.document
+
+        async with db_manager.get_read_session() as session:
+            user_service = UserService(session)
+            current_user = await user_service.get_user_word_language(message.from_user.id)
+
+        if not current_user:
+            await message.answer(t('messages.not_registered'), parse_mode='MarkdownV2')
+            return
+
+        if document.file_size and document.file_size > Config.WORD_IMPORT_MAX_FILE_SIZE:
+            await message.answer(t('messages.words_import.too_large'))
+            return
+
+        if current_user.id in importing_users:
+            await message.answer(t('messages.words_import.already_running'))
+            return
+
+        importing_users.add(current_user.id)
+        status_message = await message_tracker.send_message(
+            bot,
+            message.chat.id,
+            text=t('messages.words_import.started')
+        )
+
+        # the progress message is edited at most every WORD_IMPORT_PROGRESS_INTERVAL seconds
+        last_progress_at = monotonic()
+
+        async def report_progress(result) -> None:
+            nonlocal last_progress_at
+            if monotonic() - last_progress_at < Config.WORD_IMPORT_PROGRESS_INTERVAL:
+                return
+
+            last_progress_at = monotonic()
+            await message_tracker.edit_text(
+                status_message,
+                t('messages.words_import.progress', rows=result.rows, added=result.added)
+            )
+
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, os.path.basename(document.file_name))
+                await bot.download(document, destination=path)
+
+                import_service = WordImportService(batch_size=Config.WORD_IMPORT_BATCH_SIZE)
+                result = await import_service.import_file(
+                    path, current_user.id, current_user.language_id, progress=report_progress
+                )
+
+            await message_tracker.edit_text(
+                status_message,
+                t('messages.words_import.finished', rows=result.rows, added=result.added)
+            )
+
+        except Exception as e:
+            logger.error(f"Error importing words from {document.file_name} for user {current_user.id}: {e}")
+            await message_tracker.edit_text(status_message, t('messages.words_import.failed'))
+
+        finally:
+            importing_users.discard(current_user.id)
+
+    # export of the saved words and of the learning history, "/export json" for JSON files
+    @router.message(Command(commands=['export']))
+    @with_localization
+    async def export_words(message: types.Message, t, k, command: CommandObject):
+        export_format = (command.args or 'csv').strip().lower()
+        if export_format not in ExportService.FORMATS:
+            await message.answer(t('messages.export.unknown_format'))
+            return
+
+        with tempfile.TemporaryDirectory() as directory:
+            words_path = os.path.join(directory, f'words.{export_format}')
+            history_path = os.path.join(directory, f'learning_history.{export_format}')
+
+            async with db_manager.get_read_session() as session:
+                user_service = UserService(session)
+                current_user = await user_service.get_user_admin_status(message.from_user.id)
+
+                if not current_user:
+                    await message.answer(t('messages.not_registered'), parse_mode='MarkdownV2')
+                    return
+
+                export_service = ExportService(session)
+                await export_service.export_words(words_path, current_user.id, export_format)
+                await export_service.export_learning_history(history_path, current_user.id, export_format)
+
+            # the files are uploaded after the read connection is returned to the pool
+            await message.answer_document(FSInputFile(words_path), caption=t('messages.export.words'))
+            await message.answer_document(FSInputFile(history_path), caption=t('messages.export.history'))
+
+    # navigator over the saved words, newest first
+    @router.message(Command(commands=['words']))
+    @with_localization
+    async def show_words(message: types.Message, t, k):
+        async with db_manager.get_read_session() as session:
+            user_service = UserService(session)
+            current_user = await user_service.get_user_admin_status(message.from_user.id)
+
+            if not current_user:
+                await message.answer(t('messages.not_registered'), parse_mode='MarkdownV2')
+                return
+
+            page = await WordService(session).get_words_page(current_user.id, limit=Config.WORDS_PAGE_SIZE)
+
+        await message_tracker.send_message(
+            bot,
+            message.chat.id,
+            text=render_words_page(page, t),
+            reply_markup=generate_words_page_keyboard(page)
+        )
+
+    @router.callback_query(lambda c: c.data.startswith("words-page_"))
+    @with_localization
+    async def turn_words_page(callback_query: types.CallbackQuery, t, k):
+        # answering the callback query
+        await bot.answer_callback_query(callback_query.id)
+
+        try:
+            _, direction, created_key, word_id = callback_query.data.split("_")
+            cursor = (created_key, int(word_id))
+
+        except ValueError:
+            logger.warning(f"Malformed words page callback data: {callback_query.data}")
+            return
+
+        async with db_manager.get_read_session() as session:
+            user_service = UserService(session)
+            current_user = await user_service.get_user_admin_status(callback_query.from_user.id)
+
+            if not current_user:
+                return
+
+            page = await WordService(session).get_words_page(
+                current_user.id, cursor, newer=direction == "n", limit=Config.WORDS_PAGE_SIZE
+            )
+
+        await message_tracker.edit_text(
+            callback_query.message,
+            render_words_page(page, t),
+            reply_markup=generate_words_page_keyboard(page)
+        )
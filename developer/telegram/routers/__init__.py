@@ -1,6 +1,7 @@
 from aiogram import Bot, Dispatcher
 from .CommonRouter import init_common_router
 from .RegistrationRouter import init_registration_router
+from .VocabularyRouter import init_vocabulary_router
 
 import logging
 logger = logging.getLogger(__name__)
@@ -22,4 +23,10 @@ async def init_routers(bot: Bot, dispatcher: Dispatcher) -> None:
     except Exception as e:
         logger.error(f"Error initializing the Registration router: {e}")
 
+    #initializing the vocabulary router
+    try:
+        dispatcher.include_router(await init_vocabulary_router(bot))
+        logger.debug("Vocabulary router initialized")
 
+    except Exception as e:
+        logger.error(f"Error initializing the Vocabulary router: {e}")
@@ -42,6 +42,38 @@ def show_history():
     alembic_cfg = get_alembic_config()
     command.history(alembic_cfg)
 
+def backfill_token_usage():
+    from developer.database.session import db_manager
+    from developer.services.token_service import TokenService
+
+    # the engine of the bot, configured with the same sqlite pragmas
+    async def rebuild() -> int:
+        await db_manager.initialize()
+        try:
+            async with db_manager.get_write_session() as session:
+                return await TokenService(session).rebuild_daily_rollups()
+
+        finally:
+            await db_manager.close()
+
+    rows = asyncio.run(rebuild())
+    print(f"Token usage rollups rebuilt, {rows} daily rows")
+
+def audit_queries(users: int, rows_per_user: int, verbose: bool = False) -> bool:
+    from developer.database.query_audit import run_query_audit
+
+    plans = asyncio.run(run_query_audit(users, rows_per_user))
+    failed = [plan for plan in plans if plan.full_scans]
+
+    for plan in plans:
+        if plan.full_scans or verbose:
+            print(f"{'FULL SCAN' if plan.full_scans else 'OK'}: {' '.join(plan.statement.split())}")
+            for detail in plan.plan:
+                print(f"    {detail}")
+
+    print(f"Audited {len(plans)} queries, {len(failed)} with full scans of large tables")
+    return not failed
+
 
 if __name__ == "__main__":
     import argparse
@@ -62,6 +94,14 @@ if __name__ == "__main__":
 
     subparsers.add_parser('history', help='Show migration history')
 
+    subparsers.add_parser('backfill-usage', help='Rebuild daily token usage rollups from the tokens table')
+
+    audit_parser = subparsers.add_parser('audit', help='Check query plans of the services for full table scans')
+    audit_parser.add_argument('--users', type=int, default=1000, help='Number of seeded users (default: 1000)')
+    audit_parser.add_argument('--rows-per-user', type=int, default=20,
+                              help='Number of seeded words, tokens and payments of every user (default: 20)')
+    audit_parser.add_argument('--verbose', action='store_true', help='Print the plans of all queries')
+
     args = parser.parse_args()
 
     if args.command == "create":
@@ -79,6 +119,13 @@ if __name__ == "__main__":
     elif args.command == "history":
         show_history()
 
+    elif args.command == "backfill-usage":
+        backfill_token_usage()
+
+    elif args.command == "audit":
+        if not audit_queries(args.users, args.rows_per_user, args.verbose):
+            sys.exit(1)
+
     else:
         parser.print_help()
 